@@ -0,0 +1,70 @@
+#bloom_filter.py
+
+import os
+import math
+import struct
+import hashlib
+
+_HEADER = struct.Struct("<4sQIQ")
+_MAGIC = b"BLM1"
+
+
+class BloomFilter:
+    def __init__(self, capacity=1_000_000, error_rate=0.001):
+        """
+        Fixed size set membership test without false negatives
+
+        Memory stays at roughly 1.8 bytes per expected key for a 0.1% false
+        positive rate, however many keys are added.
+
+        Args:
+            capacity (int): Number of keys the filter is sized for
+            error_rate (float): False positive rate at capacity
+        """
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        # Application defined watermark, e.g. the last ledger row added
+        self.watermark = 0
+
+    def _positions(self, key):
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        h1, h2 = struct.unpack("<QQ", digest)
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def add(self, key):
+        for position in self._positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, key):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+    def save(self, path):
+        """Write the filter atomically"""
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(_HEADER.pack(_MAGIC, self.size, self.hashes, self.watermark))
+            f.write(self.bits)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path, capacity=1_000_000, error_rate=0.001):
+        """
+        Read a saved filter
+
+        Returns:
+            BloomFilter: The saved filter, or None if it is missing, corrupt or
+            sized for a different capacity
+        """
+        bloom = cls(capacity, error_rate)
+        try:
+            with open(path, "rb") as f:
+                magic, size, hashes, watermark = _HEADER.unpack(f.read(_HEADER.size))
+                bits = f.read()
+        except (OSError, struct.error):
+            return None
+        if magic != _MAGIC or size != bloom.size or hashes != bloom.hashes or len(bits) != len(bloom.bits):
+            return None
+        bloom.bits = bytearray(bits)
+        bloom.watermark = watermark
+        return bloom
@@ -1,35 +1,289 @@
 #chains.py
 
 import os
+import json
+import time
+import httpx
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from groq import BadRequestError, RateLimitError
 from langchain_groq import ChatGroq
 from langchain_core.prompts import PromptTemplate
+from langchain_core.runnables import RunnableLambda
+from langchain_core.prompt_values import StringPromptValue
 from langchain_core.output_parsers import JsonOutputParser
 from langchain_core.exceptions import OutputParserException
 from dotenv import load_dotenv
+from utils import estimate_tokens, split_into_chunks, repair_json, normalise_job, MAX_DESCRIPTION_CHARS, MAX_SKILLS
+from llm_cache import LLMCache, default_llm_cache
+from rate_limiter import get_rate_limiter, parse_duration
+import metrics
 
 load_dotenv()
 
+# Bump a version whenever its prompt changes, so cached responses are not reused
+EXTRACT_PROMPT_VERSION = 1
+STRUCTURED_EXTRACT_PROMPT_VERSION = 1
+EMAIL_PROMPT_VERSION = 1
+
+# Completion tokens reserved with the rate limiter before the real usage is known
+EXPECTED_OUTPUT_TOKENS = 600
+
+prompt_extract = PromptTemplate.from_template(
+    """
+    ### SCRAPED TEXT FROM WEBSITE:
+    {page_data}
+    ### INSTRUCTION:
+    The scraped text is from the career's page of a website.
+    Your job is to extract the job postings and return them in JSON format containing the following keys: `role`, `experience`, `skills` and `description`.
+    Only return the valid JSON.
+    ### VALID JSON (NO PREAMBLE):
+    """
+)
+
+JOB_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "jobs": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "role": {"type": "string"},
+                    "experience": {"type": "string"},
+                    "skills": {"type": "array", "items": {"type": "string"}, "maxItems": MAX_SKILLS},
+                    "description": {"type": "string", "maxLength": MAX_DESCRIPTION_CHARS},
+                },
+                "required": ["role", "experience", "skills", "description"],
+            },
+        },
+    },
+    "required": ["jobs"],
+}
+
+prompt_extract_structured = PromptTemplate.from_template(
+    """
+    Extract every job posting from the careers page text below.
+    Reply with one JSON object matching this JSON schema: {schema}
+    Summarise `description` in under {max_description} characters, list at most {max_skills} skills, use "" for unknown fields.
+    ### TEXT:
+    {page_data}
+    """
+)
+
+# Different length templates
+length_instructions = {
+    "Short": "Create a brief, concise cold email (around 150 words) that's straight to the point.",
+    "Medium": "Create a balanced cold email (around 250 words) with enough detail to be persuasive.",
+    "Long": "Create a comprehensive cold email (around 350 words) with detailed examples and value propositions."
+}
+
+prompt_email = PromptTemplate.from_template(
+    """
+    ### JOB DESCRIPTION:
+    {job_description}
+
+    ### INSTRUCTION:
+    You are {sender_name}, a business development executive at {company_name}. {company_name} is an AI & Software Consulting company dedicated to facilitating
+    the seamless integration of business processes through automated tools. 
+    Over our experience, we have empowered numerous enterprises with tailored solutions, fostering scalability, 
+    process optimization, cost reduction, and heightened overall efficiency. 
+    
+    {length_instruction}
+    
+    Your job is to write a cold email to the client regarding the job mentioned above describing the capability of {company_name} 
+    in fulfilling their needs.
+    Also add the most relevant ones from the following links to showcase {company_name}'s portfolio: {link_list}
+    
+    Remember you are {sender_name}, HR at {company_name}.
+    
+    Format the email properly with:
+    1. A clear subject line starting with "Subject: "
+    2. Professional greeting
+    3. Well-structured paragraphs with proper spacing between them
+    4. A call to action
+    5. Professional closing
+    6. Your name and title in the signature
+    
+    Do not provide a preamble.
+    ### EMAIL (NO PREAMBLE):
+
+    """
+)
+
+
+def _job_list(parsed):
+    """The jobs of parsed extraction output, None if it does not hold a job list"""
+    if isinstance(parsed, dict):
+        parsed = parsed.get("jobs", [parsed] if "role" in parsed else [])
+        if isinstance(parsed, dict):
+            parsed = [parsed]
+    return parsed if isinstance(parsed, list) else None
+
+
+def _failed_generation(error):
+    """Output Groq rejected as invalid JSON in JSON mode, None for any other bad request"""
+    body = error.body if isinstance(error.body, dict) else {}
+    details = body.get("error", body)
+    if not isinstance(details, dict) or details.get("code") != "json_validate_failed":
+        return None
+    return str(details.get("failed_generation") or "")
+
+
+def _job_key(job):
+    """Normalised role used to recognise the same job extracted from two chunks"""
+    return ''.join(ch for ch in str(job.get('role', '')).lower() if ch.isalnum())
+
+
+def merge_jobs(jobs):
+    """
+    Merge and de-duplicate jobs extracted from overlapping chunks
+
+    Jobs with the same role are combined: skills are unioned and the
+    longest description and first non-empty experience are kept.
+    """
+    merged = {}
+    for job in jobs:
+        if not isinstance(job, dict):
+            continue
+        key = _job_key(job) or str(len(merged))
+        if key not in merged:
+            merged[key] = dict(job)
+            continue
+        current = merged[key]
+        skills = current.get('skills') or []
+        skills = [skills] if isinstance(skills, str) else list(skills)
+        new_skills = job.get('skills') or []
+        new_skills = [new_skills] if isinstance(new_skills, str) else new_skills
+        current['skills'] = skills + [skill for skill in new_skills if skill not in skills]
+        if len(str(job.get('description') or '')) > len(str(current.get('description') or '')):
+            current['description'] = job['description']
+        if not current.get('experience') and job.get('experience'):
+            current['experience'] = job['experience']
+    return list(merged.values())
+
+
 class Chain:
-    def __init__(self, api_key=None):
+    def __init__(self, api_key=None, max_chunk_tokens=4000, max_concurrency=None, cache=None, structured_extraction=True):
+        """
+        Args:
+            api_key (str, optional): GROQ API key, defaults to GROQ_API_KEY
+            max_chunk_tokens (int): Pages above this size are extracted in chunks
+            max_concurrency (int, optional): Maximum concurrent LLM calls, defaults to LLM_CONCURRENCY or 4.
+                Every call of the Chain shares this limit, however many threads make them
+            cache (LLMCache, optional): Response cache, defaults to the on-disk one
+            structured_extraction (bool): Extract jobs in JSON mode against JOB_SCHEMA at temperature 0
+
+        Set GROQ_API_BASE to point the client at another endpoint, e.g. a local
+        fake server for testing the rate limiter.
+        """
+        self.rate_limiter = get_rate_limiter("llama-3.3-70b-versatile")
+        # Retries are ours so every caller backs off together
         self.llm = ChatGroq(
             temperature=1,
             groq_api_key=api_key or os.getenv("GROQ_API_KEY"),
-            model_name="llama-3.3-70b-versatile"
+            model_name="llama-3.3-70b-versatile",
+            max_retries=0,
+            http_client=httpx.Client(event_hooks={"response": [self._on_response]})
         )
+        self._llm_call = RunnableLambda(self._invoke_llm)
+        self.extract_llm = self.llm.bind(temperature=0, response_format={"type": "json_object"})
+        self.structured_extraction = structured_extraction
+        self.max_chunk_tokens = max_chunk_tokens
+        self.max_concurrency = max_concurrency or int(os.getenv("LLM_CONCURRENCY", 4))
+        self._llm_slots = threading.Semaphore(self.max_concurrency)
+        self.cache = cache if cache is not None else default_llm_cache()
 
-    def extract_jobs(self, cleaned_text):
-        prompt_extract = PromptTemplate.from_template(
-            """
-            ### SCRAPED TEXT FROM WEBSITE:
-            {page_data}
-            ### INSTRUCTION:
-            The scraped text is from the career's page of a website.
-            Your job is to extract the job postings and return them in JSON format containing the following keys: `role`, `experience`, `skills` and `description`.
-            Only return the valid JSON.
-            ### VALID JSON (NO PREAMBLE):
-            """
-        )
-        chain_extract = prompt_extract | self.llm
+    def _on_response(self, response):
+        self.rate_limiter.update_from_headers(response.headers)
+
+    def _call_with_retries(self, prompt_value, call):
+        """
+        Run an LLM call through the shared rate limiter, retrying 429s with backoff
+
+        Returns:
+            tuple: The call's result and the number of tokens reserved for it
+        """
+        estimated = estimate_tokens(prompt_value.to_string()) + EXPECTED_OUTPUT_TOKENS
+        for attempt in range(self.rate_limiter.max_retries + 1):
+            self.rate_limiter.acquire(estimated)
+            try:
+                return call(prompt_value), estimated
+            except RateLimitError as e:
+                self.rate_limiter.reconcile(estimated, 0)
+                metrics.incr("llm_rate_limited")
+                if attempt == self.rate_limiter.max_retries:
+                    raise
+                retry_after = parse_duration(e.response.headers.get("retry-after"))
+                delay = self.rate_limiter.backoff(attempt, retry_after)
+                print(f"Rate limited by Groq, retrying in {delay:.1f}s")
+                time.sleep(delay)
+
+    def _invoke_llm(self, prompt_value, llm=None):
+        with self._llm_slots:
+            res, estimated = self._call_with_retries(prompt_value, (llm or self.llm).invoke)
+        usage = getattr(res, "usage_metadata", None) or {}
+        self.rate_limiter.reconcile(estimated, usage.get("total_tokens"))
+        return res
+
+    def _stream_llm(self, prompt_value):
+        """Yield message chunks as they arrive; rate limits surface before the first one"""
+        def open_stream(value):
+            stream = self.llm.stream(value)
+            return next(stream, None), stream
+
+        # The slot is held until the stream is closed
+        self._llm_slots.acquire()
+        try:
+            (first, stream), estimated = self._call_with_retries(prompt_value, open_stream)
+        except BaseException:
+            self._llm_slots.release()
+            raise
+        message = first
+        try:
+            if first is None:
+                return
+            yield first
+            for chunk in stream:
+                message += chunk
+                yield chunk
+        finally:
+            # Runs when the consumer stops early or the stream fails, too
+            stream.close()
+            usage = getattr(message, "usage_metadata", None) or {}
+            actual = usage.get("total_tokens")
+            if actual is None:
+                # Usage comes with the last chunk; count the prompt and the output seen so far
+                content = getattr(message, "content", "") or ""
+                actual = estimated - EXPECTED_OUTPUT_TOKENS + estimate_tokens(str(content))
+            self.rate_limiter.reconcile(estimated, actual)
+            self._llm_slots.release()
+
+    def extract_jobs(self, cleaned_text, regenerate=False):
+        if self.structured_extraction:
+            key = self._cache_key("extract_jobs_structured", {"page_data": cleaned_text},
+                                  STRUCTURED_EXTRACT_PROMPT_VERSION, temperature=0)
+        else:
+            key = self._cache_key("extract_jobs", {"page_data": cleaned_text}, EXTRACT_PROMPT_VERSION)
+        if not regenerate:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+
+        jobs = self._extract_jobs(cleaned_text)
+        self.cache.put(key, jobs)
+        return jobs
+
+    def _extract_jobs(self, cleaned_text):
+        if estimate_tokens(cleaned_text) > self.max_chunk_tokens:
+            return self.extract_jobs_chunked(cleaned_text)
+        return self._extract_chunk(cleaned_text)
+
+    def _extract_chunk(self, cleaned_text):
+        if self.structured_extraction:
+            return self._extract_structured(cleaned_text)
+
+        chain_extract = prompt_extract | self._llm_call
         res = chain_extract.invoke(input={"page_data": cleaned_text})
         try:
             json_parser = JsonOutputParser()
@@ -38,55 +292,170 @@ class Chain:
             raise OutputParserException("Context too big. Unable to parse jobs.")
         return res if isinstance(res, list) else [res]
 
-    def write_mail(self, job, links, email_length="Medium", company_name="TCS", sender_name="Om Thakare"):
-        # Different length templates
-        length_instructions = {
-            "Short": "Create a brief, concise cold email (around 150 words) that's straight to the point.",
-            "Medium": "Create a balanced cold email (around 250 words) with enough detail to be persuasive.",
-            "Long": "Create a comprehensive cold email (around 350 words) with detailed examples and value propositions."
-        }
-        
-        prompt_email = PromptTemplate.from_template(
-            """
-            ### JOB DESCRIPTION:
-            {job_description}
-
-            ### INSTRUCTION:
-            You are {sender_name}, a business development executive at {company_name}. {company_name} is an AI & Software Consulting company dedicated to facilitating
-            the seamless integration of business processes through automated tools. 
-            Over our experience, we have empowered numerous enterprises with tailored solutions, fostering scalability, 
-            process optimization, cost reduction, and heightened overall efficiency. 
-            
-            {length_instruction}
-            
-            Your job is to write a cold email to the client regarding the job mentioned above describing the capability of {company_name} 
-            in fulfilling their needs.
-            Also add the most relevant ones from the following links to showcase {company_name}'s portfolio: {link_list}
-            
-            Remember you are {sender_name}, HR at {company_name}.
-            
-            Format the email properly with:
-            1. A clear subject line starting with "Subject: "
-            2. Professional greeting
-            3. Well-structured paragraphs with proper spacing between them
-            4. A call to action
-            5. Professional closing
-            6. Your name and title in the signature
-            
-            Do not provide a preamble.
-            ### EMAIL (NO PREAMBLE):
-
-            """
-        )
-        chain_email = prompt_email | self.llm
-        res = chain_email.invoke({
+    def extract_jobs_chunked(self, cleaned_text):
+        """
+        Map-reduce extraction for pages too large for one prompt
+
+        The text is split into token-bounded chunks, jobs are extracted from
+        the chunks concurrently and the results are merged and de-duplicated.
+        """
+        chunks = split_into_chunks(cleaned_text, self.max_chunk_tokens)
+        results = self._run_concurrently(self._extract_chunk, chunks)
+
+        jobs = []
+        for i, res in enumerate(results):
+            if isinstance(res, Exception):
+                print(f"Error extracting jobs from chunk {i + 1}/{len(chunks)}: {res}")
+                continue
+            jobs.extend(res)
+
+        if not jobs:
+            raise OutputParserException("Unable to parse jobs from any chunk.")
+        return merge_jobs(jobs)
+
+    def _extract_structured(self, cleaned_text, max_attempts=2):
+        """
+        JSON mode extraction against JOB_SCHEMA
+
+        Malformed output gets a local repair pass before the model is asked
+        again, including output Groq rejected with json_validate_failed.
+        Parse failures and output tokens are recorded in metrics.
+        """
+        prompt_value = prompt_extract_structured.invoke({
+            "schema": json.dumps(JOB_SCHEMA, separators=(",", ":")),
+            "max_description": MAX_DESCRIPTION_CHARS,
+            "max_skills": MAX_SKILLS,
+            "page_data": cleaned_text,
+        })
+        for attempt in range(max_attempts):
+            try:
+                res = self._invoke_llm(prompt_value, self.extract_llm)
+            except BadRequestError as e:
+                # Groq refuses invalid JSON in JSON mode and returns the output in the error
+                content = _failed_generation(e)
+                if content is None:
+                    raise
+                metrics.incr("extract_calls")
+                metrics.incr("extract_parse_failures")
+                candidates = (repair_json(content),)
+            else:
+                metrics.incr("extract_calls")
+                usage = getattr(res, "usage_metadata", None) or {}
+                metrics.incr("extract_output_tokens", usage.get("output_tokens", 0))
+                candidates = (res.content, repair_json(res.content))
+
+            jobs = None
+            for candidate in candidates:
+                try:
+                    jobs = _job_list(json.loads(candidate))
+                except ValueError:
+                    continue
+                if jobs is not None:
+                    break
+            if jobs is None:
+                if len(candidates) > 1:
+                    metrics.incr("extract_parse_failures")
+                print(f"Unparseable extraction output, attempt {attempt + 1}/{max_attempts}")
+                prompt_value = StringPromptValue(text=prompt_value.to_string() +
+                                                 "\nYour previous reply was not valid JSON. Reply with the JSON object only.")
+                continue
+
+            jobs = [normalise_job(job) for job in jobs if isinstance(job, dict)]
+            metrics.incr("extracted_jobs", len(jobs))
+            return jobs
+
+        raise OutputParserException("Unable to parse jobs from the model output.")
+
+    def extract_jobs_batch(self, cleaned_texts, max_concurrency=None):
+        """
+        Extract jobs from several pages concurrently
+
+        Args:
+            cleaned_texts (list): Cleaned page texts
+            max_concurrency (int, optional): Pages worked on at once, defaults to the Chain's limit
+
+        Returns:
+            list: The job list or the raised exception for each page, in input order
+        """
+        return self._run_concurrently(self.extract_jobs, cleaned_texts, max_concurrency)
+
+    def write_mails(self, requests, max_concurrency=None):
+        """
+        Write several emails concurrently
+
+        Args:
+            requests (list): Keyword arguments for write_mail, one dict per email
+            max_concurrency (int, optional): Emails worked on at once, defaults to the Chain's limit
+
+        Returns:
+            list: The email or the raised exception for each request, in input order
+        """
+        return self._run_concurrently(lambda kwargs: self.write_mail(**kwargs), requests, max_concurrency)
+
+    def _run_concurrently(self, func, items, max_concurrency=None):
+        """Run func over items on worker threads, their LLM calls still wait for the Chain's slots"""
+        items = list(items)
+        if not items:
+            return []
+        with ThreadPoolExecutor(max_workers=max_concurrency or self.max_concurrency) as pool:
+            futures = [pool.submit(func, item) for item in items]
+        results = []
+        for future in futures:
+            try:
+                results.append(future.result())
+            except Exception as e:
+                results.append(e)
+        return results
+
+    def _mail_inputs(self, job, links, email_length, company_name, sender_name):
+        # Ranked matches from Portfolio.match_links only need their URLs in the prompt
+        if links and all(isinstance(link, dict) and "link" in link for link in links):
+            links = "\n".join(f"- {link['link']}" for link in links)
+        return {
             "job_description": str(job), 
             "link_list": links,
             "length_instruction": length_instructions.get(email_length, length_instructions["Medium"]),
             "company_name": company_name,
             "sender_name": sender_name
-        })
+        }
+
+    def _cache_key(self, kind, inputs, version, temperature=None):
+        temperature = self.llm.temperature if temperature is None else temperature
+        return LLMCache.make_key(kind, inputs, self.llm.model_name, temperature, version)
+
+    def write_mail(self, job, links, email_length="Medium", company_name="TCS", sender_name="Om Thakare", regenerate=False):
+        inputs = self._mail_inputs(job, links, email_length, company_name, sender_name)
+        key = self._cache_key("write_mail", inputs, EMAIL_PROMPT_VERSION)
+        if not regenerate:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+
+        chain_email = prompt_email | self._llm_call
+        res = chain_email.invoke(inputs)
+        self.cache.put(key, res.content)
         return res.content
 
+    def stream_mail(self, job, links, email_length="Medium", company_name="TCS", sender_name="Om Thakare", regenerate=False):
+        """
+        Streaming variant of write_mail that yields the email text as it arrives
+
+        A cached email is yielded in one piece. The complete email is cached
+        once the stream finishes.
+        """
+        inputs = self._mail_inputs(job, links, email_length, company_name, sender_name)
+        key = self._cache_key("write_mail", inputs, EMAIL_PROMPT_VERSION)
+        if not regenerate:
+            cached = self.cache.get(key)
+            if cached is not None:
+                yield cached
+                return
+
+        parts = []
+        for chunk in self._stream_llm(prompt_email.invoke(inputs)):
+            parts.append(chunk.content)
+            yield chunk.content
+        self.cache.put(key, "".join(parts))
+
 if __name__ == "__main__":
     print(os.getenv("GROQ_API_KEY"))
\ No newline at end of file
@@ -0,0 +1,153 @@
+#content_extractor.py
+
+import re
+from urllib.parse import urlparse
+from bs4 import BeautifulSoup
+
+# Bump whenever the extracted text changes, so cleaned texts in the page cache are redone
+EXTRACTOR_VERSION = 1
+
+# Containers that hold the job posting body on sites we know
+SITE_SELECTORS = {
+    "linkedin.com": [
+        ".show-more-less-html__markup",
+        ".description__text",
+        ".jobs-description__content",
+        ".jobs-box__html-content",
+    ],
+    "indeed.com": [
+        "#jobDescriptionText",
+        ".jobsearch-jobDescriptionText",
+        ".jobsearch-JobComponent-description",
+    ],
+}
+
+# Job title and company, kept in front of the body; the page <title> is added after them
+TITLE_SELECTORS = [
+    ".top-card-layout__title",
+    ".topcard__title",
+    ".topcard__org-name-link",
+    ".jobsearch-JobInfoHeader-title",
+    "[data-company-name]",
+    "h1",
+]
+# Longest heading kept, longer matches are not titles
+MAX_HEADING_LENGTH = 200
+
+BOILERPLATE_TAGS = ["script", "style", "noscript", "template", "svg", "iframe", "nav", "footer",
+                    "header", "aside", "form", "button", "select"]
+BOILERPLATE_ROLES = {"navigation", "banner", "contentinfo", "search", "dialog", "complementary"}
+BOILERPLATE_PATTERN = re.compile(
+    r"cookie|consent|gdpr|banner|footer|header|navbar|nav-|menu|sidebar|breadcrumb|share|social|"
+    r"related|similar|recommend|suggest|subscribe|newsletter|signup|sign-in|login|modal|popup|advert|promo",
+    re.I
+)
+KEEP_TAGS = {"html", "body", "main", "article"}
+PARAGRAPH_TAGS = ["p", "li", "pre", "td", "dd", "div", "span"]
+
+# Minimum text length for a site selector or a scored block to be trusted
+MIN_CONTENT_LENGTH = 200
+
+
+def extract_main_content(html, url=None):
+    """
+    Isolate the job posting body of a page
+
+    Site-specific selectors are tried first, then boilerplate such as
+    navigation, footers, cookie banners and "similar jobs" widgets is
+    removed and the densest remaining text block is picked. The job title,
+    company and page title are read before anything is removed and put in
+    front of the body, so the role is never lost with the page header.
+
+    Args:
+        html (str): Raw page HTML
+        url (str, optional): Page URL, used to pick site-specific selectors
+
+    Returns:
+        tuple: Main content text and the full page text
+    """
+    soup = BeautifulSoup(html, "html.parser")
+    full_text = soup.get_text(" ")
+    headings = _headings(soup)
+
+    host = urlparse(url).netloc.lower() if url else ""
+    for domain, selectors in SITE_SELECTORS.items():
+        if domain in host:
+            for selector in selectors:
+                node = soup.select_one(selector)
+                if node is not None and len(node.get_text(" ", strip=True)) >= MIN_CONTENT_LENGTH:
+                    return _with_headings(headings, node.get_text(" ")), full_text
+
+    _strip_boilerplate(soup)
+    body = soup.body or soup
+    node = _densest_block(body)
+    if node is None:
+        return _with_headings(headings, body.get_text(" ")), full_text
+    return _with_headings(headings, node.get_text(" ")), full_text
+
+
+def _headings(soup):
+    """Job title, company and page title of a page, in that order"""
+    headings = []
+    nodes = [soup.select_one(selector) for selector in TITLE_SELECTORS] + [soup.title]
+    for node in nodes:
+        if node is None:
+            continue
+        text = node.get_text(" ", strip=True)
+        if text and len(text) <= MAX_HEADING_LENGTH and text not in headings:
+            headings.append(text)
+    return headings
+
+
+def _with_headings(headings, text):
+    missing = [heading for heading in headings if heading not in text]
+    return "\n".join(missing + [text])
+
+
+def _strip_boilerplate(soup):
+    for node in soup.find_all(BOILERPLATE_TAGS):
+        node.decompose()
+
+    total = len(soup.get_text(" ", strip=True)) or 1
+    for node in soup.find_all(True):
+        if node.decomposed or node.name in KEEP_TAGS or node.attrs is None:
+            continue
+        role = (node.get("role") or "").lower()
+        marker = " ".join(node.get("class") or []) + " " + (node.get("id") or "")
+        if role in BOILERPLATE_ROLES or node.get("aria-modal") or BOILERPLATE_PATTERN.search(marker):
+            # Never drop a wrapper that holds most of the page
+            if len(node.get_text(" ", strip=True)) < total * 0.5:
+                node.decompose()
+
+
+def _link_density(node):
+    text_length = len(node.get_text(" ", strip=True)) or 1
+    link_length = sum(len(link.get_text(" ", strip=True)) for link in node.find_all("a"))
+    return link_length / text_length
+
+
+def _densest_block(root):
+    """Readability style scoring: paragraphs vote for their parent and grandparent"""
+    nodes = {}
+    scores = {}
+    for paragraph in root.find_all(PARAGRAPH_TAGS):
+        own_text = "".join(paragraph.find_all(string=True, recursive=False)).strip()
+        if len(own_text) < 25:
+            continue
+        score = 1 + own_text.count(",") + min(len(own_text) // 100, 3)
+        for ancestor, weight in ((paragraph.parent, 1), (paragraph.parent.parent if paragraph.parent else None, 0.5)):
+            if ancestor is None or ancestor.name is None:
+                continue
+            nodes[id(ancestor)] = ancestor
+            scores[id(ancestor)] = scores.get(id(ancestor), 0) + score * weight
+
+    best, best_score = None, 0
+    for key, score in scores.items():
+        node = nodes[key]
+        score *= 1 - _link_density(node)
+        if score > best_score:
+            best, best_score = node, score
+
+    if best is None or len(best.get_text(" ", strip=True)) < MIN_CONTENT_LENGTH:
+        return None
+    return best
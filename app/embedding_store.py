@@ -0,0 +1,206 @@
+#embedding_store.py
+
+import os
+import json
+import time
+import hashlib
+import threading
+import contextlib
+import numpy as np
+
+# A lock file older than this is left over from a crashed writer
+STALE_LOCK_SECONDS = 120
+
+
+def embedding_model_id(embedding_function):
+    """Identity of an embedding function, e.g. "DefaultEmbeddingFunction:all-MiniLM-L6-v2" """
+    model = getattr(embedding_function, "model_name", None) or getattr(embedding_function, "MODEL_NAME", None)
+    if model is None and hasattr(embedding_function, "_model"):
+        model = getattr(embedding_function._model, "MODEL_NAME", None)
+    return f"{type(embedding_function).__name__}:{model or ''}"
+
+
+def text_key(text):
+    """Content hash a stored embedding is looked up by"""
+    return hashlib.sha1(str(text).encode("utf-8")).hexdigest()
+
+
+@contextlib.contextmanager
+def _file_lock(path, timeout=30):
+    """Hold a lock file across processes, raising TimeoutError if it stays taken"""
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            break
+        except FileExistsError:
+            try:
+                if time.time() - os.path.getmtime(path) > STALE_LOCK_SECONDS:
+                    os.remove(path)
+                    continue
+            except OSError:
+                continue
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"{path} is held by another writer")
+            time.sleep(0.05)
+    try:
+        yield
+    finally:
+        os.close(fd)
+        os.remove(path)
+
+
+class EmbeddingStore:
+    def __init__(self, path, model_id):
+        """
+        Embeddings persisted next to the portfolio CSV
+
+        Vectors live in a float32 .npy file that is memory-mapped on load, and
+        a JSON file beside it lists the content hash of each row's text. Every
+        save writes a new uniquely named .npy before the JSON that points to
+        it is swapped in, so readers never see a key list paired with the
+        wrong vectors. Writers take a lock file and merge with what is on
+        disk, so concurrent saves keep each other's embeddings. Stored
+        vectors are ignored if they were made by another model.
+
+        Args:
+            path (str): Path prefix of the sidecar files, ".json" is appended
+            model_id (str): Identity of the embedding model
+        """
+        self.path = path
+        self.model_id = model_id
+        self._lock = threading.Lock()
+        self._vectors = None
+        self._vectors_file = None
+        self._index = {}
+        self._new = {}
+        self._load()
+
+    def _read(self):
+        """Index, memory-mapped vectors and vectors file on disk, or Nones"""
+        try:
+            with open(self.path + ".json", encoding="utf-8") as f:
+                meta = json.load(f)
+            if meta.get("model") != self.model_id:
+                return None, None, None
+            vectors_file = os.path.join(os.path.dirname(self.path), meta["vectors"])
+            vectors = np.load(vectors_file, mmap_mode="r")
+        except (OSError, ValueError, KeyError, TypeError):
+            return None, None, None
+        keys = meta.get("keys", [])
+        if vectors.ndim != 2 or len(keys) != len(vectors):
+            return None, None, None
+        return {key: row for row, key in enumerate(keys)}, vectors, vectors_file
+
+    def _load(self):
+        index, vectors, vectors_file = self._read()
+        if index is not None:
+            self._index, self._vectors, self._vectors_file = index, vectors, vectors_file
+
+    def __len__(self):
+        return len(self._index) + len(self._new)
+
+    def lookup(self, texts):
+        """
+        Stored embeddings of texts
+
+        Returns:
+            list: A read-only vector or None for each text, in input order
+        """
+        results = []
+        with self._lock:
+            for text in texts:
+                key = text_key(text)
+                if key in self._new:
+                    results.append(self._new[key])
+                elif key in self._index:
+                    results.append(self._vectors[self._index[key]])
+                else:
+                    results.append(None)
+        return results
+
+    def add(self, texts, embeddings):
+        """Remember new embeddings until the next save()"""
+        with self._lock:
+            for text, embedding in zip(texts, embeddings):
+                key = text_key(text)
+                if key not in self._index:
+                    self._new[key] = np.asarray(embedding, dtype=np.float32)
+
+    def save(self, keep_keys=None):
+        """
+        Merge stored and new embeddings into the sidecar files
+
+        Args:
+            keep_keys (set, optional): text_key of every text still in use, embeddings of
+                other texts are dropped. None keeps everything.
+        """
+        with self._lock:
+            if not self._new and (keep_keys is None or keep_keys.issuperset(self._index)):
+                return
+            try:
+                directory = os.path.dirname(self.path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                with _file_lock(self.path + ".lock"):
+                    self._save_locked(keep_keys)
+            except OSError as e:
+                print(f"Error saving embeddings to {self.path}: {e}")
+
+    def _save_locked(self, keep_keys=None):
+        # Another writer may have saved since we loaded, start from its files
+        disk_index, disk_vectors, disk_file = self._read()
+        keys, parts, seen = [], [], set()
+        if keep_keys is not None:
+            # Keys of texts no longer in use count as seen, so they are skipped
+            for index in (disk_index, self._index, self._new):
+                seen.update(key for key in index or {} if key not in keep_keys)
+        for index, vectors in ((disk_index, disk_vectors), (self._index, self._vectors)):
+            rows = []
+            for key, row in (index or {}).items():
+                if key not in seen:
+                    seen.add(key)
+                    keys.append(key)
+                    rows.append(row)
+            if rows:
+                parts.append(np.asarray(vectors[rows], dtype=np.float32))
+        new_keys = [key for key in self._new if key not in seen]
+        if new_keys:
+            parts.append(np.stack([self._new[key] for key in new_keys]))
+        keys += new_keys
+
+        # Vectors of another dimension cannot share the matrix, keep the newest
+        dim = parts[-1].shape[1] if parts else 0
+        kept_keys, kept_parts, start = [], [np.zeros((0, dim), dtype=np.float32)], 0
+        for part in parts:
+            if part.shape[1] == dim:
+                kept_keys += keys[start:start + len(part)]
+                kept_parts.append(part)
+            start += len(part)
+        keys, vectors = kept_keys, np.concatenate(kept_parts)
+
+        vectors_file = f"{self.path}.{os.urandom(6).hex()}.npy"
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(vectors_file, "wb") as f:
+            np.save(f, vectors)
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({
+                "model": self.model_id,
+                "dim": int(vectors.shape[1]),
+                "vectors": os.path.basename(vectors_file),
+                "keys": keys,
+            }, f)
+        os.replace(tmp_path, self.path + ".json")
+
+        # Nothing points to the replaced vectors files any more, unmap them before removing
+        superseded = {disk_file, self._vectors_file} - {None, vectors_file}
+        disk_vectors = None
+        self._vectors = np.load(vectors_file, mmap_mode="r")
+        self._vectors_file = vectors_file
+        self._index = {key: row for row, key in enumerate(keys)}
+        self._new = {}
+        for path in superseded:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
@@ -0,0 +1,286 @@
+#fetcher.py
+
+import os
+import codecs
+import asyncio
+import contextlib
+import threading
+import aiohttp
+from page_cache import default_page_cache
+from politeness import HostScheduler, parse_host_intervals
+from content_extractor import extract_main_content
+from utils import clean_text, estimate_tokens
+import metrics
+
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+    'Accept-Language': 'en-US,en;q=0.5',
+    'Referer': 'https://www.google.com/',
+    'DNT': '1',
+    'Connection': 'keep-alive',
+    'Upgrade-Insecure-Requests': '1',
+    'Cache-Control': 'max-age=0',
+}
+
+# Bytes read from the connection between calls to a stream consumer
+STREAM_CHUNK_SIZE = 16 * 1024
+
+
+class Page:
+    def __init__(self, url, status, html, headers=None, cleaned=None, cache=None, from_cache=False):
+        """
+        A fetched web page
+
+        Args:
+            url (str): The requested URL
+            status (int): HTTP status code
+            html (str): Decoded response body
+            headers (dict, optional): Response headers
+            cleaned (str, optional): Cleaned text, if already known
+            cache (PageCache, optional): Cache the cleaned text is written back to
+            from_cache (bool): Whether the page was served from the cache
+        """
+        self.url = url
+        self.status = status
+        self.html = html
+        self.headers = headers or {}
+        self.from_cache = from_cache
+        self._cleaned = cleaned
+        self._cache = cache
+
+    @property
+    def cleaned(self):
+        """Main content of the page run through clean_text, computed once and cached"""
+        if self._cleaned is None:
+            main_text, full_text = extract_main_content(self.html, self.url)
+            self._cleaned = clean_text(main_text)
+
+            metrics.incr("content_tokens_in", estimate_tokens(full_text))
+            metrics.incr("content_tokens_out", estimate_tokens(self._cleaned))
+
+            if self._cache is not None:
+                self._cache.set_cleaned(self.url, self._cleaned)
+        return self._cleaned
+
+
+class Fetcher:
+    def __init__(self, headers=None, max_concurrency=20, max_per_host=4, timeout=30, cache=None, scheduler=None):
+        """
+        Asyncio based HTTP fetch engine with pooled keep-alive connections
+
+        The event loop runs in a background thread so the synchronous callers
+        (Streamlit, the scheduler) can share one connection pool.
+
+        Args:
+            headers (dict, optional): Request headers sent with every request
+            max_concurrency (int): Maximum number of requests in flight
+            max_per_host (int): Maximum open connections per host
+            timeout (int): Total timeout per request in seconds
+            cache (PageCache, optional): On-disk page cache shared by all callers
+            scheduler (HostScheduler, optional): Per-host politeness, requests wait for their
+                host's slot before taking a global one
+        """
+        self.headers = headers or DEFAULT_HEADERS
+        self.max_concurrency = max_concurrency
+        self.max_per_host = max_per_host
+        self.timeout = timeout
+        self.cache = cache
+        self.scheduler = scheduler
+        self._session = None
+        self._semaphore = None
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="fetcher", daemon=True)
+        self._thread.start()
+
+    def _run(self, coro):
+        """Run a coroutine on the fetcher loop and wait for its result"""
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result()
+
+    async def _get_session(self):
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.max_concurrency,
+                limit_per_host=self.max_per_host,
+                ttl_dns_cache=300,
+                keepalive_timeout=30
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                headers=self.headers,
+                timeout=aiohttp.ClientTimeout(total=self.timeout)
+            )
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._session
+
+    def _host_slot(self, url, session):
+        if self.scheduler is None:
+            return contextlib.nullcontext()
+        return self.scheduler.slot(url, session)
+
+    def _cached_page(self, entry, status=200):
+        return Page(entry["url"], status, entry["html"], cleaned=entry["cleaned"], cache=self.cache, from_cache=True)
+
+    async def _fetch(self, url, max_age=None):
+        entry = self.cache.get(url) if self.cache is not None else None
+        if entry is not None and self.cache.is_fresh(entry, max_age):
+            return self._cached_page(entry)
+
+        session = await self._get_session()
+        async with self._host_slot(url, session):
+            async with self._semaphore:
+                async with session.get(url, headers=self._conditional_headers(entry)) as response:
+                    if response.status == 304 and entry is not None:
+                        self.cache.touch(url)
+                        return self._cached_page(entry, status=304)
+                    response.raise_for_status()
+                    html = await response.text(errors="replace")
+                    if self.cache is not None:
+                        self.cache.put(url, html, response.headers.get("ETag"), response.headers.get("Last-Modified"))
+                    return Page(url, response.status, html, dict(response.headers), cache=self.cache)
+
+    def _conditional_headers(self, entry):
+        """Revalidate stale entries instead of downloading them again"""
+        conditional = {}
+        if entry is not None:
+            if entry["etag"]:
+                conditional["If-None-Match"] = entry["etag"]
+            if entry["last_modified"]:
+                conditional["If-Modified-Since"] = entry["last_modified"]
+        return conditional
+
+    async def _fetch_many(self, urls, max_age=None):
+        return await asyncio.gather(*(self._fetch(url, max_age) for url in urls), return_exceptions=True)
+
+    async def _fetch_stream(self, url, consumer, max_age=None, keep_body=False):
+        entry = self.cache.get(url) if self.cache is not None else None
+        if entry is not None and self.cache.is_fresh(entry, max_age):
+            consumer(entry["html"])
+            return self._cached_page(entry)
+
+        session = await self._get_session()
+        async with self._host_slot(url, session):
+            async with self._semaphore:
+                async with session.get(url, headers=self._conditional_headers(entry)) as response:
+                    if response.status == 304 and entry is not None:
+                        self.cache.touch(url)
+                        consumer(entry["html"])
+                        return self._cached_page(entry, status=304)
+                    response.raise_for_status()
+
+                    decoder = codecs.getincrementaldecoder(response.charset or "utf-8")(errors="replace")
+                    parts = []
+                    consuming = True
+                    async for chunk in response.content.iter_chunked(STREAM_CHUNK_SIZE):
+                        text = decoder.decode(chunk)
+                        parts.append(text)
+                        if consuming and consumer(text):
+                            consuming = False
+                            if not (keep_body() if callable(keep_body) else keep_body):
+                                # Drop the connection rather than reading the rest of the body
+                                response.close()
+                                return None
+                    parts.append(decoder.decode(b"", final=True))
+                    if consuming:
+                        consumer(parts[-1])
+
+                    html = "".join(parts)
+                    if self.cache is not None:
+                        self.cache.put(url, html, response.headers.get("ETag"), response.headers.get("Last-Modified"))
+                    return Page(url, response.status, html, dict(response.headers), cache=self.cache)
+
+    async def _fetch_stream_many(self, urls, consumers, max_age=None, keep_body=False):
+        return await asyncio.gather(
+            *(self._fetch_stream(url, consumer, max_age, keep_body) for url, consumer in zip(urls, consumers)),
+            return_exceptions=True
+        )
+
+    def fetch(self, url, max_age=None):
+        """
+        Fetch a single page
+
+        Args:
+            url (str): The URL to fetch
+            max_age (int, optional): Override the cache TTL, 0 always revalidates
+
+        Returns:
+            Page: The fetched page. Raises on network or HTTP errors.
+        """
+        return self._run(self._fetch(url, max_age))
+
+    def fetch_many(self, urls, max_age=None):
+        """
+        Fetch several pages concurrently
+
+        Args:
+            urls (list): URLs to fetch
+            max_age (int, optional): Override the cache TTL, 0 always revalidates
+
+        Returns:
+            list: A Page or the raised exception for each URL, in input order
+        """
+        return self._run(self._fetch_many(list(urls), max_age))
+
+    def fetch_stream(self, url, consumer, max_age=None, keep_body=False):
+        """
+        Fetch a page, handing its body to a consumer while it downloads
+
+        The consumer is called on the fetcher's event loop with each decoded
+        chunk of HTML and returns True once it needs no more input. The rest
+        of the body is then not downloaded, unless keep_body is set or returns
+        True when called at that point. Cached pages are handed over in a
+        single chunk.
+
+        Args:
+            url (str): The URL to fetch
+            consumer (callable): Takes a str chunk, returns True to stop
+            max_age (int, optional): Override the cache TTL, 0 always revalidates
+            keep_body (bool or callable): Download and cache the whole page after the consumer stops,
+                a callable is asked on the event loop each time a consumer stops
+
+        Returns:
+            Page: The fetched page, or None if the download was stopped early.
+            Raises on network or HTTP errors.
+        """
+        return self._run(self._fetch_stream(url, consumer, max_age, keep_body))
+
+    def fetch_stream_many(self, urls, consumers, max_age=None, keep_body=False):
+        """
+        Stream several pages concurrently, one consumer per URL
+
+        Returns:
+            list: A Page, None or the raised exception for each URL, in input order
+        """
+        return self._run(self._fetch_stream_many(list(urls), list(consumers), max_age, keep_body))
+
+    def close(self):
+        """Close pooled connections and stop the event loop"""
+        if self._session is not None:
+            self._run(self._session.close())
+        self._loop.call_soon_threadsafe(self._loop.stop)
+
+
+_fetcher = None
+_fetcher_lock = threading.Lock()
+
+
+def get_fetcher():
+    """Return the process-wide Fetcher, so the concurrency limit is global"""
+    global _fetcher
+    with _fetcher_lock:
+        if _fetcher is None:
+            _fetcher = Fetcher(
+                max_concurrency=int(os.getenv("FETCH_CONCURRENCY", 20)),
+                max_per_host=int(os.getenv("FETCH_MAX_PER_HOST", 4)),
+                cache=default_page_cache(),
+                scheduler=HostScheduler(
+                    min_interval=float(os.getenv("FETCH_HOST_INTERVAL", 0.5)),
+                    max_per_host=int(os.getenv("FETCH_MAX_PER_HOST", 4)),
+                    user_agent=DEFAULT_HEADERS['User-Agent'],
+                    respect_robots=os.getenv("FETCH_RESPECT_ROBOTS", "1") != "0",
+                    host_intervals=parse_host_intervals(
+                        os.getenv("FETCH_HOST_INTERVALS", "linkedin.com=3,indeed.com=2")
+                    )
+                )
+            )
+        return _fetcher
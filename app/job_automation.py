@@ -1,17 +1,25 @@
 import schedule
 import time
-import requests
-from bs4 import BeautifulSoup
-import pandas as pd
-from datetime import datetime
-import os
-from langchain_community.document_loaders import WebBaseLoader
-from chains import Chain
-from portfolio import Portfolio
+import threading
+import aiohttp
+from registry import get_chain, get_portfolio
+from fetcher import get_fetcher
+from job_ledger import JobLedger
+from job_identity import job_key, canonical_url
+from link_extractor import JobLinkExtractor, next_page_url
+from keyword_matcher import KeywordMatcher
+from near_duplicates import default_near_duplicate_index
+from pipeline import Pipeline, Stage
+from sources import MAX_SITEMAP_DEPTH, find_source, job_postings_from_html
 from utils import clean_text
+import metrics
+
+# Job keys kept as a listing site's watermark
+MAX_WATERMARK_KEYS = 50
 
 class JobAutomation:
-    def __init__(self, target_sites, job_keywords, max_jobs_per_day=5, chain=None, portfolio=None):
+    def __init__(self, target_sites, job_keywords, max_jobs_per_day=5, chain=None, portfolio=None, fetcher=None, pipelined=False,
+                 near_duplicates=None, max_listing_pages=5):
         """
         Initialize the job automation system
         
@@ -21,57 +29,42 @@ class JobAutomation:
             max_jobs_per_day (int): Maximum number of emails to generate per day
             chain (Chain, optional): Chain instance for processing jobs
             portfolio (Portfolio, optional): Portfolio instance
+            fetcher (Fetcher, optional): Fetch engine, defaults to the shared one
+            pipelined (bool): Run process_jobs as concurrent stages instead of strict phases
+            near_duplicates (NearDuplicateIndex, optional): Fingerprints of processed postings
+            max_listing_pages (int): Most listing pages followed per site and run
         """
         self.target_sites = target_sites
         self.job_keywords = job_keywords
         self.max_jobs_per_day = max_jobs_per_day
-        self.chain = chain or Chain()
-        self.portfolio = portfolio or Portfolio()
-        
-        if portfolio is None:
-            self.portfolio.load_portfolio()
+        self.chain = chain or get_chain()
+        self.portfolio = portfolio or get_portfolio()
+        self.fetcher = fetcher or get_fetcher()
+        self.pipelined = pipelined
+        self.keyword_matcher = KeywordMatcher(job_keywords)
+        # Keyword hits of each relevant job, for ranking
+        self.keyword_hits = {}
+        # Postings read from structured feeds, by job URL
+        self.structured_jobs = {}
+        # Job keys of each crawled listing in listing order, and keys this run scanned and rejected
+        self.listing_crawls = {}
+        self.settled_keys = set()
+        # Original posting of each job key skipped as a near duplicate
+        self.near_duplicate_of = {}
+        self.near_duplicates = near_duplicates or default_near_duplicate_index()
+        self.near_duplicates_skipped = 0
+        self.max_listing_pages = max_listing_pages
             
         self.processed_jobs = self._load_processed_jobs()
-        self.headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-            'Accept-Language': 'en-US,en;q=0.5',
-            'Referer': 'https://www.google.com/',
-            'DNT': '1',
-            'Connection': 'keep-alive',
-            'Upgrade-Insecure-Requests': '1',
-            'Cache-Control': 'max-age=0',
-        }
         
     def _load_processed_jobs(self):
-        """Load list of already processed job URLs"""
-        try:
-            if os.path.exists('processed_jobs.csv'):
-                df = pd.read_csv('processed_jobs.csv')
-                return set(df['job_url'].tolist())
-            return set()
-        except Exception as e:
-            print(f"Error loading processed jobs: {e}")
-            return set()
+        """Open the ledger of already processed jobs"""
+        return JobLedger()
             
     def _save_processed_job(self, job_url, email, job_data):
         """Save a record of processed job"""
-        today = datetime.now().strftime('%Y-%m-%d')
-        new_row = pd.DataFrame({
-            'date': [today],
-            'job_url': [job_url],
-            'email': [email],
-            'job_data': [str(job_data)]
-        })
-        
-        if os.path.exists('processed_jobs.csv'):
-            df = pd.read_csv('processed_jobs.csv')
-            df = pd.concat([df, new_row], ignore_index=True)
-        else:
-            df = new_row
-            
-        df.to_csv('processed_jobs.csv', index=False)
-        self.processed_jobs.add(job_url)
+        self.processed_jobs.add(job_url, email, job_data)
+        self.near_duplicates.commit(job_url)
         
     def scrape_job_listings(self, site_url):
         """
@@ -83,143 +76,553 @@ class JobAutomation:
         Returns:
             list: List of job URLs found
         """
-        try:
-            response = requests.get(site_url, headers=self.headers, timeout=30)
-            response.raise_for_status()  # Raise exception for bad status codes
-            
-            soup = BeautifulSoup(response.text, 'html.parser')
-            
-            # List to store job links
-            job_links = []
-            
-            # Site-specific scraping logic - this is a generic approach
-            # LinkedIn jobs
-            if 'linkedin.com' in site_url.lower():
-                for link in soup.find_all('a', href=True):
-                    href = link['href']
-                    if '/jobs/view/' in href:
-                        if not href.startswith(('http://', 'https://')):
-                            href = f"https://www.linkedin.com{href}"
-                        job_links.append(href)
-            
-            # Indeed jobs
-            elif 'indeed.com' in site_url.lower():
-                for link in soup.find_all('a', href=True):
-                    href = link['href']
-                    if '/viewjob?' in href or '/company/' in href:
-                        if not href.startswith(('http://', 'https://')):
-                            href = f"https://www.indeed.com{href}"
-                        job_links.append(href)
+        return self.scrape_all_listings([site_url])
+    
+    def scrape_all_listings(self, site_urls):
+        """
+        Scrape job listings from several sites concurrently
+        
+        Sites hosted on an ATS with a structured feed (Greenhouse, Lever,
+        Workable) and XML sitemaps are read through their feed, see
+        _read_feeds. Other sites are crawled incrementally, following their
+        pagination. Each round fetches the next page of every site still
+        being paged at once, as conditional requests. A site stops paging at
+        a page that reaches its watermark, postings below which were all
+        scanned or processed by earlier runs, when no next page is known, or
+        after max_listing_pages pages. Links of an unchanged page come from
+        the page cache, so nothing is downloaded for it.
+        
+        Args:
+            site_urls (list): The URLs to scrape for job listings
             
-            # Generic job links (fallback for other sites)
+        Returns:
+            list: List of job URLs found across all sites, one per posting
+        """
+        all_job_urls = {}
+        feeds = []
+        listings = []
+        for site_url in dict.fromkeys(site_urls):
+            source, feed_url = find_source(site_url)
+            if source:
+                feeds.append((source, feed_url))
             else:
-                for link in soup.find_all('a', href=True):
-                    href = link['href']
-                    # Filter for job links (customize this logic for each site)
-                    if '/job/' in href or '/career/' in href or '/position/' in href or 'viewjob' in href:
-                        if not href.startswith(('http://', 'https://')):
-                            # Handle relative URLs
-                            if href.startswith('/'):
-                                base_url = '/'.join(site_url.split('/')[:3])  # Get domain part of URL
-                                href = base_url + href
-                            else:
-                                href = f"{site_url.rstrip('/')}/{href.lstrip('/')}"
-                        
-                        job_links.append(href)
+                listings.append(site_url)
+        
+        self._read_feeds(feeds, all_job_urls)
+        self._crawl_listings(listings, all_job_urls)
+        return list(all_job_urls.values())
+    
+    def _read_feeds(self, feeds, all_job_urls):
+        """
+        Read the postings of structured job feeds
+        
+        Postings that come with their fields are kept in structured_jobs and
+        never go through LLM extraction. Sitemap indexes are followed up to
+        MAX_SITEMAP_DEPTH levels deep.
+        
+        Args:
+            feeds (list): (JobSource, feed URL) pairs
+            all_job_urls (dict): Job URLs found so far by job key, updated in place
+        """
+        for _ in range(MAX_SITEMAP_DEPTH + 1):
+            if not feeds:
+                break
+            pages = self.fetcher.fetch_many([feed_url for _, feed_url in feeds], max_age=0)
+            next_feeds = []
             
-            # Remove duplicates and return
-            return list(set(job_links))
+            for (source, feed_url), page in zip(feeds, pages):
+                if isinstance(page, Exception):
+                    print(f"Error reading {source.name} feed {feed_url}: {page}")
+                    continue
+                try:
+                    postings, more_feeds = source.parse(page.html, feed_url)
+                except Exception as e:
+                    print(f"Error reading {source.name} feed {feed_url}: {e}")
+                    continue
+                for posting in postings:
+                    job_url = all_job_urls.setdefault(job_key(posting.url), canonical_url(posting.url))
+                    if posting.job:
+                        self.structured_jobs[job_url] = posting
+                next_feeds.extend((source, url) for url in more_feeds)
+            feeds = next_feeds
+    
+    def _crawl_listings(self, site_urls, all_job_urls):
+        """
+        Follow the pagination of HTML listing sites, see scrape_all_listings
+        
+        The job keys of each site are kept in listing_crawls, in listing
+        order, so _advance_watermarks can tell what this run settled.
+        """
+        next_pages = {site_url: site_url for site_url in site_urls}
+        watermarks = {site_url: self.processed_jobs.get_watermark(site_url) for site_url in next_pages}
+        crawls = {site_url: {"jobs": [], "covered_from": None, "failed": False} for site_url in next_pages}
+        
+        for _ in range(self.max_listing_pages):
+            if not next_pages:
+                break
+            sites = list(next_pages)
+            page_urls = [next_pages[site_url] for site_url in sites]
+            # Links are picked out of each page as it streams in
+            extractors = [JobLinkExtractor(page_url) for page_url in page_urls]
+            pages = self.fetcher.fetch_stream_many(page_urls, [extractor.feed for extractor in extractors], max_age=0)
+            next_pages = {}
             
-        except requests.RequestException as e:
-            print(f"Error scraping {site_url}: {e}")
-            return []
-        except Exception as e:
-            print(f"Unexpected error scraping {site_url}: {e}")
-            return []
+            for site_url, page_url, extractor, page in zip(sites, page_urls, extractors, pages):
+                crawl = crawls[site_url]
+                if isinstance(page, aiohttp.ClientError):
+                    print(f"Error scraping {page_url}: {page}")
+                    crawl["failed"] = True
+                    continue
+                if isinstance(page, Exception):
+                    print(f"Unexpected error scraping {page_url}: {page}")
+                    crawl["failed"] = True
+                    continue
+                try:
+                    extractor.close()
+                    for job_url in self._unique_jobs(extractor.links):
+                        key = job_key(job_url)
+                        all_job_urls.setdefault(key, job_url)
+                        if crawl["covered_from"] is None and key in watermarks[site_url]:
+                            crawl["covered_from"] = len(crawl["jobs"])
+                        crawl["jobs"].append((key, job_url))
+                    
+                    # Stop paging once we reach postings settled by an earlier run
+                    if crawl["covered_from"] is not None or not extractor.links:
+                        continue
+                    next_url = next_page_url(page_url, extractor.next_url)
+                    if next_url and next_url != page_url:
+                        next_pages[site_url] = next_url
+                except Exception as e:
+                    print(f"Unexpected error scraping {page_url}: {e}")
+                    crawl["failed"] = True
+        
+        self.listing_crawls.update(crawls)
+    
+    def _advance_watermarks(self):
+        """
+        Move the watermark of each crawled listing down to settled postings
+        
+        Every posting below a watermark key was scanned or processed, or is
+        a near duplicate of a processed one, so the next crawl can stop
+        there. The watermark only moves to the postings under the lowest one
+        still waiting for a scan or an email, which keeps unscanned postings
+        from a capped run above it. A crawl that failed on a page keeps its
+        old watermark, since it never saw what lies between that page and
+        the watermark. Postings past max_listing_pages only sink further on
+        later crawls, so a crawl cut off there still moves it.
+        """
+        for site_url, crawl in self.listing_crawls.items():
+            if crawl["failed"]:
+                continue
+            covered_from = crawl["covered_from"]
+            if covered_from is None:
+                covered_from = len(crawl["jobs"])
+            settled = []
+            for key, job_url in reversed(crawl["jobs"][:covered_from]):
+                original = self.near_duplicate_of.get(key)
+                if not (key in self.settled_keys or job_url in self.processed_jobs
+                        or original is not None and original in self.processed_jobs):
+                    break
+                settled.append(key)
+            if settled:
+                # Newest settled postings first, a page's worth is enough to stop on
+                self.processed_jobs.set_watermark(site_url, settled[::-1][:MAX_WATERMARK_KEYS])
+    
+    def _unique_jobs(self, job_links):
+        """Remove duplicate postings and return their canonical URLs"""
+        unique_jobs = {}
+        for href in job_links:
+            unique_jobs.setdefault(job_key(href), canonical_url(href))
+        return list(unique_jobs.values())
             
-    def filter_relevant_jobs(self, job_urls):
+    def filter_relevant_jobs(self, job_urls, keep_body=False):
         """
         Filter jobs based on keywords and already processed URLs
         
+        Pages are fetched concurrently in batches of the fetcher's concurrency
+        limit, so we stop early once enough relevant jobs are found. All
+        keywords are matched in one pass over the streamed page, and a
+        download is cut short as soon as the page is known to be relevant.
+        Postings from structured feeds are matched on their text without
+        any download. The keyword hits of each relevant job are kept in
+        keyword_hits.
+        
         Args:
             job_urls (list): List of job URLs to filter
+            keep_body (bool): Finish downloading relevant pages so they are cached for processing,
+                only as many as still fit in max_jobs_per_day. Relevant pages past that are left
+                for a later run.
             
         Returns:
             list: Filtered list of job URLs
         """
         relevant_jobs = []
-        count = 0
         
-        for url in job_urls:
-            # Skip already processed jobs
-            if url in self.processed_jobs:
-                continue
-                
-            try:
-                # Load job page
-                loader = WebBaseLoader([url])
-                data = clean_text(loader.load().pop().page_content)
-                
-                # Check if any keywords match
-                if any(keyword.lower() in data.lower() for keyword in self.job_keywords):
-                    relevant_jobs.append(url)
-                    count += 1
+        # Skip already processed jobs, including those of runs that overlap this one
+        self.processed_jobs.refresh()
+        candidates = [url for url in job_urls if url not in self.processed_jobs]
+        
+        for url in [url for url in candidates if url in self.structured_jobs]:
+            if self._match_posting(url):
+                relevant_jobs.append(url)
+                if len(relevant_jobs) >= self.max_jobs_per_day:
+                    return relevant_jobs
+        candidates = [url for url in candidates if url not in self.structured_jobs]
+        batch_size = self.fetcher.max_concurrency
+        
+        for start in range(0, len(candidates), batch_size):
+            batch = candidates[start:start + batch_size]
+            scanners = [self.keyword_matcher.html_scanner() for _ in batch]
+            keep = self._budget_keeper(self.max_jobs_per_day - len(relevant_jobs)) if keep_body else False
+            pages = self.fetcher.fetch_stream_many(batch, [scanner.feed for scanner in scanners], keep_body=keep)
+            
+            for url, scanner, page in zip(batch, scanners, pages):
+                if isinstance(page, Exception):
+                    print(f"Error filtering job {url}: {page}")
+                    continue
                     
-                # Stop once we've found enough jobs
-                if count >= self.max_jobs_per_day:
-                    break
+                try:
+                    scanner.close()
                     
-                # Small delay to avoid overwhelming the servers
-                time.sleep(0.5)
-                
-            except Exception as e:
-                print(f"Error filtering job {url}: {e}")
+                    # Relevant but over budget, its download was cut short
+                    if keep_body and page is None and scanner.matched:
+                        continue
+                    
+                    # Check if any keywords match
+                    if scanner.matched:
+                        self.keyword_hits[url] = scanner.counts
+                        relevant_jobs.append(url)
+                    else:
+                        self.settled_keys.add(job_key(url))
+                        
+                    # Stop once we've found enough jobs
+                    if len(relevant_jobs) >= self.max_jobs_per_day:
+                        return relevant_jobs
+                        
+                except Exception as e:
+                    print(f"Error filtering job {url}: {e}")
                 
         return relevant_jobs
     
+    @staticmethod
+    def _budget_keeper(remaining):
+        """keep_body test of a fetch batch that keeps the first remaining relevant pages"""
+        kept = 0
+        
+        def keep():
+            nonlocal kept
+            kept += 1
+            return kept <= remaining
+        
+        return keep
+    
+    def _match_posting(self, job_url):
+        """Check the text of a structured posting against the keywords"""
+        counts = self.keyword_matcher.count(self.structured_jobs[job_url].text)
+        if len(counts) < self.keyword_matcher.min_keywords:
+            self.settled_keys.add(job_key(job_url))
+            return False
+        self.keyword_hits[job_url] = counts
+        return True
+    
+    def _posting_text(self, job_url, page):
+        """Cleaned text of a posting, from its feed or its page"""
+        posting = self.structured_jobs.get(job_url)
+        return clean_text(posting.text) if posting else page.cleaned
+    
+    def _known_jobs(self, job_url, page):
+        """
+        Jobs of a posting that need no LLM extraction
+        
+        Args:
+            job_url (str): URL of the posting
+            page (Page): Its page, None for postings from a structured feed
+            
+        Returns:
+            list: Jobs from the structured feed or the page's JSON-LD, None if the page must be extracted
+        """
+        posting = self.structured_jobs.get(job_url)
+        jobs = [posting.job] if posting else job_postings_from_html(page.html, job_url)
+        if not jobs:
+            return None
+        metrics.incr("structured_jobs", len(jobs))
+        return jobs
+    
+    def _is_near_duplicate(self, job_url, data):
+        """Check whether a posting repeats one that was already processed"""
+        original = self.near_duplicates.check(job_url, data)
+        if original is None:
+            return False
+        print(f"Skipping job {job_url}: near duplicate of {original}")
+        self.near_duplicate_of[job_key(job_url)] = original
+        self.near_duplicates_skipped += 1
+        metrics.incr("near_duplicates_skipped")
+        return True
+    
+    def _start_run(self):
+        """Reset the state kept for a single run"""
+        self.near_duplicates.reset_run()
+        self.near_duplicates_skipped = 0
+        self.structured_jobs = {}
+        self.listing_crawls = {}
+        self.settled_keys = set()
+        self.near_duplicate_of = {}
+        # Counters are process-wide, a run reports its change since here
+        self._metrics_start = metrics.snapshot()
+    
     def process_jobs(self):
         """Process jobs and generate emails"""
-        all_job_urls = []
+        if self.pipelined:
+            return self.process_jobs_pipelined()
+        
+        self._start_run()
         
         # Scrape all target sites
-        for site in self.target_sites:
-            job_urls = self.scrape_job_listings(site)
-            all_job_urls.extend(job_urls)
+        all_job_urls = self.scrape_all_listings(self.target_sites)
             
         # Filter to relevant jobs
-        relevant_jobs = self.filter_relevant_jobs(all_job_urls)
+        relevant_jobs = self.filter_relevant_jobs(all_job_urls, keep_body=True)
         
         print(f"Found {len(relevant_jobs)} new relevant jobs")
         
-        # Process each job
-        processed_count = 0
-        for job_url in relevant_jobs:
+        # Load all job pages concurrently, reusing the pages cached while filtering.
+        # Postings from structured feeds have no page to load.
+        page_urls = [url for url in relevant_jobs if url not in self.structured_jobs]
+        loaded = dict(zip(page_urls, self.fetcher.fetch_many(page_urls)))
+        pages = [loaded.get(url) for url in relevant_jobs]
+        
+        try:
+            self._generate_emails(relevant_jobs, pages)
+        finally:
+            self._finish_run()
+    
+    def process_jobs_pipelined(self):
+        """
+        Process jobs with every step running at once
+        
+        Scraping, fetching and filtering, extraction, portfolio matching,
+        mail writing and persisting are stages joined by bounded queues, so
+        the LLM works on the first jobs while later pages are still being
+        downloaded. Slots of the daily budget are reserved before a mail is
+        written and released if it fails, and the pipeline stops as soon as
+        the limit is reached.
+        """
+        self._start_run()
+        seen = set()
+        seen_lock = threading.Lock()
+        budget = threading.Condition()
+        # Pages kept for extraction and those that left before the write stage
+        counts = {"reserved": 0, "written": 0, "kept": 0, "dropped": 0}
+        
+        def scrape(site_url):
+            job_urls = self.scrape_job_listings(site_url)
+            with seen_lock:
+                new_urls = [url for url in job_urls if url not in seen]
+                seen.update(new_urls)
+            self.processed_jobs.refresh()
+            return [url for url in new_urls if url not in self.processed_jobs]
+        
+        def keep_page():
+            # Relevant pages are only downloaded in full while they can still fit in the budget
+            with budget:
+                if counts["kept"] - counts["dropped"] >= self.max_jobs_per_day:
+                    return False
+                counts["kept"] += 1
+                return True
+        
+        def drop_page():
+            with budget:
+                counts["dropped"] += 1
+        
+        def fetch_and_filter(job_url):
+            if job_url in self.structured_jobs:
+                if not self._match_posting(job_url):
+                    return []
+                with budget:
+                    counts["kept"] += 1
+                return [(job_url, None)]
+            scanner = self.keyword_matcher.html_scanner()
+            page = self.fetcher.fetch_stream(job_url, scanner.feed, keep_body=keep_page)
+            scanner.close()
+            if not scanner.matched:
+                self.settled_keys.add(job_key(job_url))
+                return []
+            if page is None:
+                return []
+            self.keyword_hits[job_url] = scanner.counts
+            return [(job_url, page)]
+        
+        def extract(item):
+            job_url, page = item
+            if self._is_near_duplicate(job_url, self._posting_text(job_url, page)):
+                drop_page()
+                return []
+            try:
+                jobs = self._known_jobs(job_url, page)
+                if jobs is None:
+                    jobs = self.chain.extract_jobs(page.cleaned)
+            except Exception:
+                self.near_duplicates.release(job_url)
+                drop_page()
+                raise
+            jobs = [(job_url, job) for job in jobs if isinstance(job, dict)]
+            if not jobs:
+                self.near_duplicates.release(job_url)
+                drop_page()
+            return jobs
+        
+        def match(item):
+            job_url, job = item
+            try:
+                return [(job_url, job, self.portfolio.match_links(job.get('skills', [])))]
+            except Exception:
+                self.near_duplicates.release(job_url)
+                raise
+        
+        def write(item):
+            job_url, job, links = item
+            with budget:
+                # Wait for a failed write to free its slot, or for the limit to be reached
+                while counts["reserved"] >= self.max_jobs_per_day:
+                    if counts["written"] >= self.max_jobs_per_day:
+                        self.near_duplicates.release(job_url)
+                        return []
+                    budget.wait(0.1)
+                counts["reserved"] += 1
             try:
-                # Load and process job
-                loader = WebBaseLoader([job_url])
-                data = clean_text(loader.load().pop().page_content)
+                email = self.chain.write_mail(job, links)
+            except Exception:
+                with budget:
+                    counts["reserved"] -= 1
+                    budget.notify_all()
+                self.near_duplicates.release(job_url)
+                raise
+            with budget:
+                counts["written"] += 1
+                if counts["written"] >= self.max_jobs_per_day:
+                    pipeline.stop()
+                budget.notify_all()
+            return [(job_url, job, email)]
+        
+        def persist(item):
+            job_url, job, email = item
+            self._save_processed_job(job_url, email, job)
+            print(f"Generated email for job: {job.get('role', 'Unknown Role')} at {job_url}")
+            return []
+        
+        fetch_workers = self.fetcher.max_concurrency
+        llm_workers = self.chain.max_concurrency
+        pipeline = Pipeline([
+            Stage("scrape", scrape, workers=min(len(self.target_sites), fetch_workers)),
+            Stage("filter", fetch_and_filter, workers=fetch_workers),
+            Stage("extract", extract, workers=llm_workers),
+            Stage("match", match, workers=2),
+            Stage("write", write, workers=llm_workers),
+            Stage("persist", persist, drain=True),
+        ])
+        
+        try:
+            pipeline.run(self.target_sites)
+            if counts["written"] >= self.max_jobs_per_day:
+                print(f"Reached daily limit of {self.max_jobs_per_day} jobs")
+        finally:
+            self._finish_run()
+    
+    def _finish_run(self):
+        """Persist the ledger and watermarks and report the run's metrics"""
+        self.processed_jobs.flush()
+        self._advance_watermarks()
+        stats = metrics.since(self._metrics_start)
+        print(f"Content extraction: {stats.get('content_tokens_in', 0)} page tokens "
+              f"reduced to {stats.get('content_tokens_out', 0)} prompt tokens")
+        print(f"LLM cache: {stats.get('llm_cache_hits', 0)} hits, {stats.get('llm_cache_misses', 0)} misses")
+        if stats.get('structured_jobs'):
+            print(f"Structured postings: {stats['structured_jobs']} jobs read from feeds and JSON-LD without the LLM")
+        if self.near_duplicates_skipped:
+            print(f"Near duplicates: {self.near_duplicates_skipped} postings skipped, "
+                  f"saving {self.near_duplicates_skipped} extraction calls and their emails")
+        if stats.get('extract_calls'):
+            print(f"Extraction: {stats.get('extract_parse_failures', 0) / stats['extract_calls']:.0%} parse failures, "
+                  f"{stats.get('extract_output_tokens', 0) / max(stats.get('extracted_jobs', 0), 1):.0f} output tokens per job")
+    
+    def _generate_emails(self, relevant_jobs, pages):
+        """
+        Extract jobs from the loaded pages and write an email for each
+        
+        Postings from structured feeds and pages with JobPosting JSON-LD are
+        used as they are, only the other pages go through LLM extraction.
+        
+        Extraction and mail writing fan out across jobs on the Chain's
+        concurrency limit. Mails are written in waves sized to the remaining
+        daily budget, so failures are retried with the next job and the limit
+        is honoured exactly. Postings that fail or fall past the limit are
+        released from the near-duplicate index.
+        """
+        loaded = []
+        for job_url, page in zip(relevant_jobs, pages):
+            if isinstance(page, Exception):
+                print(f"Error processing job {job_url}: {page}")
+                continue
+            if self._is_near_duplicate(job_url, self._posting_text(job_url, page)):
+                continue
+            loaded.append((job_url, page))
+        
+        candidates = []
+        unstructured = []
+        for job_url, page in loaded:
+            jobs = self._known_jobs(job_url, page)
+            if jobs is None:
+                unstructured.append((job_url, page))
+            else:
+                candidates.extend((job_url, job) for job in jobs)
+        
+        # Extract job details from every other page concurrently
+        extracted = self.chain.extract_jobs_batch([page.cleaned for _, page in unstructured]) if unstructured else []
+        
+        for (job_url, _), jobs in zip(unstructured, extracted):
+            if isinstance(jobs, Exception):
+                print(f"Error processing job {job_url}: {jobs}")
+                self.near_duplicates.release(job_url)
+                continue
+            jobs = [(job_url, job) for job in jobs if isinstance(job, dict)]
+            if not jobs:
+                self.near_duplicates.release(job_url)
+            candidates.extend(jobs)
+        
+        processed_count = 0
+        while candidates and processed_count < self.max_jobs_per_day:
+            wave = candidates[:self.max_jobs_per_day - processed_count]
+            candidates = candidates[len(wave):]
+            
+            matched = []
+            for job_url, job in wave:
+                try:
+                    links = self.portfolio.match_links(job.get('skills', []))
+                    matched.append((job_url, job, links))
+                except Exception as e:
+                    print(f"Error processing job {job_url}: {e}")
+                    self.near_duplicates.release(job_url)
+            emails = self.chain.write_mails([{"job": job, "links": links} for _, job, links in matched])
+            
+            for (job_url, job, _), email in zip(matched, emails):
+                if isinstance(email, Exception):
+                    print(f"Error processing job {job_url}: {email}")
+                    self.near_duplicates.release(job_url)
+                    continue
                 
-                # Extract job details
-                jobs = self.chain.extract_jobs(data)
+                # Save generated email and mark job as processed
+                self._save_processed_job(job_url, email, job)
                 
-                for job in jobs:
-                    skills = job.get('skills', [])
-                    links = self.portfolio.query_links(skills)
-                    email = self.chain.write_mail(job, links)
-                    
-                    # Save generated email and mark job as processed
-                    self._save_processed_job(job_url, email, job)
-                    
-                    # Log success
-                    print(f"Generated email for job: {job.get('role', 'Unknown Role')} at {job_url}")
-                    
-                    processed_count += 1
-                    if processed_count >= self.max_jobs_per_day:
-                        print(f"Reached daily limit of {self.max_jobs_per_day} jobs")
-                        return
-                    
-            except Exception as e:
-                print(f"Error processing job {job_url}: {e}")
+                # Log success
+                print(f"Generated email for job: {job.get('role', 'Unknown Role')} at {job_url}")
+                processed_count += 1
+        
+        # Postings past the daily limit were never emailed
+        for job_url, _ in candidates:
+            self.near_duplicates.release(job_url)
+        
+        if processed_count >= self.max_jobs_per_day:
+            print(f"Reached daily limit of {self.max_jobs_per_day} jobs")
     
     def run_daily(self, hour=9, minute=0):
         """Schedule the job to run daily at specified time"""
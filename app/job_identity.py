@@ -0,0 +1,101 @@
+#job_identity.py
+
+import re
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+# Query parameters that only track where a click came from
+TRACKING_PARAMS = {
+    "from", "trk", "trkinfo", "refid", "trackingid", "ref", "referer", "referrer", "src", "source",
+    "fbclid", "gclid", "msclkid", "mc_cid", "mc_eid", "ebp", "tk", "vjs", "advn", "adid", "sjdu",
+    "lipi", "midtoken", "midsig", "otptoken", "alternatechannel", "originalsubdomain", "currentjobid",
+    "geoid", "rcm", "xkcb",
+}
+TRACKING_PREFIXES = ("utm_", "trk_", "_hs", "pk_")
+
+_LINKEDIN_JOB_ID = re.compile(r"/jobs/view/(?:[^/?#]*?-)?(\d+)")
+_GREENHOUSE_JOB_ID = re.compile(r"/jobs/(\d+)")
+_LEVER_JOB_ID = re.compile(r"^/([^/]+)/([0-9a-f-]{36})", re.I)
+
+
+def _site_job_id(host, path, params):
+    """Stable (site, id, canonical URL) of a posting on a site we know, or None"""
+    if "indeed." in host:
+        jk = params.get("jk") or params.get("vjk")
+        if jk:
+            return "indeed", jk, f"https://www.indeed.com/viewjob?jk={jk}"
+    elif "linkedin.com" in host:
+        match = _LINKEDIN_JOB_ID.search(path)
+        job_id = match.group(1) if match else params.get("currentjobid")
+        if job_id and job_id.isdigit():
+            return "linkedin", job_id, f"https://www.linkedin.com/jobs/view/{job_id}/"
+    elif "greenhouse.io" in host:
+        match = _GREENHOUSE_JOB_ID.search(path)
+        if match:
+            return "greenhouse", match.group(1), urlunsplit(("https", host, path.rstrip("/"), "", ""))
+        # Board pages link postings as ?gh_jid=<id>, the embedded form as ?for=<board>&token=<id>
+        board = params.get("for") or next((segment for segment in path.split("/") if segment), None)
+        job_id = params.get("gh_jid") or params.get("token")
+        if job_id and board and board != "embed":
+            return "greenhouse", job_id, f"https://{host}/{board}/jobs/{job_id}"
+        if job_id:
+            return "greenhouse", job_id, urlunsplit(("https", host, path.rstrip("/"), urlencode({"gh_jid": job_id}), ""))
+    elif host == "jobs.lever.co":
+        match = _LEVER_JOB_ID.search(path)
+        if match:
+            return "lever", match.group(2).lower(), f"https://jobs.lever.co/{match.group(1)}/{match.group(2).lower()}"
+    return None
+
+
+def _split(url):
+    parts = urlsplit(url.strip())
+    host = parts.netloc.lower()
+    if host.endswith(":80") or host.endswith(":443"):
+        host = host.rsplit(":", 1)[0]
+    # Keep the original key case for the query, but look ids up case-insensitively
+    query = parse_qsl(parts.query, keep_blank_values=True)
+    params = {key.lower(): value for key, value in query}
+    return parts, host, query, params
+
+
+def canonical_url(url):
+    """
+    Canonical form of a job URL
+
+    Known job sites are reduced to their posting id, other URLs lose their
+    fragment, tracking parameters and trailing slash and keep their other
+    parameters in sorted order.
+
+    Args:
+        url (str): Job URL as found on a listing page
+
+    Returns:
+        str: Canonical URL
+    """
+    parts, host, query, params = _split(url)
+    known = _site_job_id(host, parts.path, params)
+    if known:
+        return known[2]
+
+    query = sorted(
+        (key, value) for key, value in query
+        if key.lower() not in TRACKING_PARAMS and not key.lower().startswith(TRACKING_PREFIXES)
+    )
+    path = parts.path.rstrip("/") or "/"
+    return urlunsplit(((parts.scheme or "https").lower(), host, path, urlencode(query), ""))
+
+
+def job_key(url):
+    """
+    Stable identity of the posting behind a URL, e.g. "indeed:5f1b2c3d4e5f6a7b"
+
+    Args:
+        url (str): Job URL
+
+    Returns:
+        str: The site's job id where one is known, otherwise the canonical URL
+    """
+    parts, host, _, params = _split(url)
+    known = _site_job_id(host, parts.path, params)
+    if known:
+        return f"{known[0]}:{known[1]}"
+    return "url:" + canonical_url(url)
@@ -0,0 +1,221 @@
+#job_ledger.py
+
+import os
+import csv
+import json
+import sqlite3
+import threading
+from datetime import datetime
+from job_identity import job_key
+from bloom_filter import BloomFilter
+
+
+class JobLedger:
+    def __init__(self, path="processed_jobs.db", csv_path="processed_jobs.csv", batch_size=20,
+                 bloom_path="processed_jobs.bloom", bloom_capacity=1_000_000):
+        """
+        Append-only ledger of processed jobs backed by SQLite in WAL mode
+
+        Jobs are identified by their canonical job key, so the same posting
+        reached through different URLs counts once. Lookups first ask a
+        persistent Bloom filter, which answers most "not seen" questions
+        without touching the database, and confirm positives through an index
+        on job_key. Records are committed in batches. Overlapping runs are
+        safe since every write is a single transaction.
+
+        Args:
+            path (str): SQLite file holding the ledger
+            csv_path (str): Legacy processed_jobs.csv, imported once if present
+            batch_size (int): Number of records buffered before a commit
+            bloom_path (str): File holding the Bloom filter, None keeps it in memory only
+            bloom_capacity (int): Number of jobs the Bloom filter is sized for
+        """
+        self.path = path
+        self.batch_size = batch_size
+        self.bloom_path = bloom_path
+        self.bloom_capacity = bloom_capacity
+        self._pending = []
+        self._pending_keys = set()
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS processed_jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                date TEXT NOT NULL,
+                job_url TEXT NOT NULL,
+                email TEXT,
+                job_data TEXT,
+                job_key TEXT
+            )
+        """)
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(processed_jobs)")}
+        if "job_key" not in columns:
+            self._conn.execute("ALTER TABLE processed_jobs ADD COLUMN job_key TEXT")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS processed_jobs_job_url ON processed_jobs (job_url)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS processed_jobs_job_key ON processed_jobs (job_key)")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS ledger_meta (key TEXT PRIMARY KEY, value TEXT)")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS site_watermarks (
+                site_url TEXT PRIMARY KEY,
+                job_keys TEXT NOT NULL,
+                updated_at TEXT NOT NULL
+            )
+        """)
+        self._migrate_csv(csv_path)
+        self._backfill_job_keys()
+        self._bloom = None
+        with self._lock:
+            self._load_bloom()
+
+    def _migrate_csv(self, csv_path):
+        """Import the legacy CSV history once"""
+        if not csv_path or not os.path.exists(csv_path):
+            return
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                done = self._conn.execute("SELECT 1 FROM ledger_meta WHERE key = 'csv_migrated'").fetchone()
+                if not done:
+                    with open(csv_path, newline="", encoding="utf-8") as f:
+                        rows = (
+                            (row.get("date", ""), row["job_url"], row.get("email"), row.get("job_data"))
+                            for row in csv.DictReader(f)
+                        )
+                        self._conn.executemany(
+                            "INSERT INTO processed_jobs (date, job_url, email, job_data) VALUES (?, ?, ?, ?)",
+                            rows
+                        )
+                    self._conn.execute(
+                        "INSERT INTO ledger_meta (key, value) VALUES ('csv_migrated', ?)",
+                        (datetime.now().isoformat(),)
+                    )
+                self._conn.execute("COMMIT")
+            except Exception as e:
+                self._conn.execute("ROLLBACK")
+                print(f"Error migrating {csv_path}: {e}")
+                return
+        try:
+            os.replace(csv_path, csv_path + ".migrated")
+        except OSError:
+            pass
+
+    def _backfill_job_keys(self, batch_size=5000):
+        """Compute the job key of rows written before keys were recorded"""
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT id, job_url FROM processed_jobs WHERE job_key IS NULL LIMIT ?", (batch_size,)
+                ).fetchall()
+                if not rows:
+                    return
+                self._conn.execute("BEGIN IMMEDIATE")
+                try:
+                    self._conn.executemany(
+                        "UPDATE processed_jobs SET job_key = ? WHERE id = ?",
+                        [(job_key(job_url), row_id) for row_id, job_url in rows]
+                    )
+                    self._conn.execute("COMMIT")
+                except Exception:
+                    self._conn.execute("ROLLBACK")
+                    raise
+
+    def _load_bloom(self):
+        """Open the saved Bloom filter, or rebuild it from the ledger"""
+        bloom = BloomFilter.load(self.bloom_path, self.bloom_capacity) if self.bloom_path else None
+        self._bloom = bloom or BloomFilter(self.bloom_capacity)
+        self._catch_up()
+
+    def _catch_up(self):
+        """Add rows written since the filter was saved, including those of other processes"""
+        cursor = self._conn.execute(
+            "SELECT id, job_key FROM processed_jobs WHERE id > ? ORDER BY id", (self._bloom.watermark,)
+        )
+        added = False
+        for row_id, key in cursor:
+            if key:
+                self._bloom.add(key)
+            self._bloom.watermark = row_id
+            added = True
+        if added and self.bloom_path:
+            try:
+                self._bloom.save(self.bloom_path)
+            except OSError as e:
+                print(f"Error saving {self.bloom_path}: {e}")
+
+    def refresh(self):
+        """Pick up jobs other processes recorded since the last check, before a pass of lookups"""
+        with self._lock:
+            self._catch_up()
+
+    def __contains__(self, job_url):
+        key = job_key(job_url)
+        with self._lock:
+            if key in self._pending_keys:
+                return True
+            # A Bloom filter miss is definite, a hit still needs the exact check
+            if key not in self._bloom:
+                return False
+            row = self._conn.execute(
+                "SELECT 1 FROM processed_jobs WHERE job_key = ? LIMIT 1", (key,)
+            ).fetchone()
+        return row is not None
+
+    def __len__(self):
+        with self._lock:
+            count = self._conn.execute("SELECT COUNT(*) FROM processed_jobs").fetchone()[0]
+            return count + len(self._pending)
+
+    def add(self, job_url, email, job_data):
+        """Record a processed job, committing once a batch is full"""
+        today = datetime.now().strftime('%Y-%m-%d')
+        with self._lock:
+            key = job_key(job_url)
+            self._pending.append((today, job_url, email, str(job_data), key))
+            self._pending_keys.add(key)
+            if len(self._pending) >= self.batch_size:
+                self._flush()
+
+    def get_watermark(self, site_url):
+        """Job keys at the top of a listing site on its last crawl"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT job_keys FROM site_watermarks WHERE site_url = ?", (site_url,)
+            ).fetchone()
+        return set(json.loads(row[0])) if row else set()
+
+    def set_watermark(self, site_url, job_keys):
+        """Remember the newest job keys of a listing site"""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO site_watermarks (site_url, job_keys, updated_at) VALUES (?, ?, ?)",
+                (site_url, json.dumps(list(job_keys)), datetime.now().isoformat())
+            )
+
+    def flush(self):
+        """Commit buffered records"""
+        with self._lock:
+            self._flush()
+
+    def _flush(self):
+        if not self._pending:
+            return
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            self._conn.executemany(
+                "INSERT INTO processed_jobs (date, job_url, email, job_data, job_key) VALUES (?, ?, ?, ?, ?)",
+                self._pending
+            )
+            self._conn.execute("COMMIT")
+        except Exception:
+            self._conn.execute("ROLLBACK")
+            raise
+        self._pending = []
+        self._pending_keys = set()
+        self._catch_up()
+
+    def close(self):
+        """Commit buffered records and close the database"""
+        self.flush()
+        self._conn.close()
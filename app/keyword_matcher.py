@@ -0,0 +1,217 @@
+#keyword_matcher.py
+
+import re
+from collections import deque
+from html.parser import HTMLParser
+
+# Everything except letters, digits, "+" and "#" separates words, so
+# "C++", "C#" and "node.js" ("node js") still match as keywords
+_SEPARATORS = re.compile(r"[^\w+#]+|_+")
+
+# Text inside these tags is never shown to the reader
+_HIDDEN_TAGS = {"script", "style", "noscript", "template", "svg", "head"}
+
+
+def normalise_keyword(text):
+    """Lowercase text and collapse every run of separators into one space"""
+    return _SEPARATORS.sub(" ", text.lower()).strip()
+
+
+class KeywordMatcher:
+    def __init__(self, keywords, min_keywords=1):
+        """
+        Aho-Corasick automaton matching every keyword in a single pass
+
+        Keywords match whole words only, case-insensitively, and phrases
+        match across any whitespace or punctuation between their words.
+
+        Args:
+            keywords (list): Keywords and phrases to look for
+            min_keywords (int): Distinct keywords a text needs to be relevant
+        """
+        self.keywords = []
+        self.min_keywords = min_keywords
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [[]]
+
+        for keyword in keywords:
+            pattern = normalise_keyword(keyword)
+            if not pattern or keyword in self.keywords:
+                continue
+            self.keywords.append(keyword)
+            # Padding with spaces turns word boundaries into ordinary characters
+            self._add(f" {pattern} ", len(self.keywords) - 1)
+        self._build()
+
+    def _add(self, pattern, index):
+        state = 0
+        for char in pattern:
+            if char not in self._goto[state]:
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+                self._goto[state][char] = len(self._goto) - 1
+            state = self._goto[state][char]
+        self._out[state].append(index)
+
+    def _build(self):
+        """Breadth-first pass filling in failure links and merged outputs"""
+        # Children of the root fall back to the root
+        todo = deque(self._goto[0].values())
+        while todo:
+            state = todo.popleft()
+            for char, child in self._goto[state].items():
+                todo.append(child)
+                self._fail[child] = self._step(self._fail[state], char) if state else 0
+                self._out[child] = self._out[child] + self._out[self._fail[child]]
+
+    def _step(self, state, char):
+        while state and char not in self._goto[state]:
+            state = self._fail[state]
+        return self._goto[state].get(char, 0)
+
+    def scanner(self):
+        """Return a streaming scanner for plain text"""
+        return KeywordScanner(self)
+
+    def html_scanner(self):
+        """Return a streaming scanner for the visible text of an HTML document"""
+        return HtmlKeywordScanner(self)
+
+    def count(self, text):
+        """
+        Count keyword hits in a complete text
+
+        Args:
+            text (str): Text to scan
+
+        Returns:
+            dict: Hits per keyword, only keywords that matched
+        """
+        scanner = KeywordScanner(self, stop_early=False)
+        scanner.feed(text)
+        scanner.close()
+        return scanner.counts
+
+
+class KeywordScanner:
+    def __init__(self, matcher, stop_early=True):
+        """
+        Keyword matching state of one text fed in chunks
+
+        Args:
+            matcher (KeywordMatcher): The automaton to run
+            stop_early (bool): Stop scanning once the text is known to be relevant
+        """
+        self.matcher = matcher
+        self.stop_early = stop_early
+        self.hits = [0] * len(matcher.keywords)
+        self.matched_keywords = 0
+        self.done = False
+        self._state = matcher._step(0, " ")
+        self._last = " "
+
+    @property
+    def matched(self):
+        """Whether enough distinct keywords have been seen"""
+        return self.matched_keywords >= self.matcher.min_keywords
+
+    @property
+    def counts(self):
+        """Hits per keyword, only keywords that matched"""
+        return {keyword: hits for keyword, hits in zip(self.matcher.keywords, self.hits) if hits}
+
+    def feed(self, text):
+        """
+        Scan the next chunk of text
+
+        Returns:
+            bool: True once scanning has stopped and no more input is needed
+        """
+        if self.done:
+            return True
+        text = _SEPARATORS.sub(" ", text.lower())
+        if not text:
+            return False
+        if text[0] == " " and self._last == " ":
+            text = text[1:]
+
+        matcher = self.matcher
+        goto, fail, out = matcher._goto, matcher._fail, matcher._out
+        state = self._state
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for index in out[state]:
+                if not self.hits[index]:
+                    self.matched_keywords += 1
+                self.hits[index] += 1
+            if out[state] and self.stop_early and self.matched:
+                self.done = True
+                break
+        self._state = state
+        if text:
+            self._last = text[-1]
+        return self.done
+
+    def close(self):
+        """Finish the text, matching a keyword that ends it"""
+        if not self.done:
+            self.feed(" ")
+        self.done = True
+
+
+class HtmlKeywordScanner(HTMLParser):
+    def __init__(self, matcher, stop_early=True):
+        """
+        Streaming HTML parser feeding the visible text to a KeywordScanner
+
+        Args:
+            matcher (KeywordMatcher): The automaton to run
+            stop_early (bool): Stop scanning once the page is known to be relevant
+        """
+        super().__init__(convert_charrefs=True)
+        self.scanner = KeywordScanner(matcher, stop_early)
+        self._hidden = 0
+
+    @property
+    def matched(self):
+        return self.scanner.matched
+
+    @property
+    def counts(self):
+        return self.scanner.counts
+
+    def feed(self, data):
+        """
+        Scan the next chunk of HTML
+
+        Returns:
+            bool: True once scanning has stopped and no more input is needed
+        """
+        if not self.scanner.done:
+            super().feed(data)
+        return self.scanner.done
+
+    def close(self):
+        """Finish the document"""
+        if not self.scanner.done:
+            super().close()
+        self.scanner.close()
+
+    def handle_starttag(self, tag, attrs):
+        if tag in _HIDDEN_TAGS:
+            self._hidden += 1
+        # Tags separate words, e.g. "<li>Python</li><li>Java</li>"
+        self.scanner.feed(" ")
+
+    def handle_endtag(self, tag):
+        if tag in _HIDDEN_TAGS and self._hidden:
+            self._hidden -= 1
+        self.scanner.feed(" ")
+
+    def handle_data(self, data):
+        if not self._hidden:
+            self.scanner.feed(data)
@@ -0,0 +1,141 @@
+#link_extractor.py
+
+import re
+import html
+from urllib.parse import urljoin, urlsplit, urlunsplit, parse_qsl, urlencode
+
+# Attributes of a tag, a quoted value may hold ">"
+_ATTRS = r'''(?:"[^"]*"|'[^']*'|[^'">])*'''
+# Start of anything the scanner cares about
+_TOKEN = re.compile(rf'<!--|<(script|style|textarea|title)\b{_ATTRS}>|<(a|base|link)\s{_ATTRS}>', re.I)
+# A tag cut off by the end of a chunk, possibly inside a quoted value
+_PARTIAL_TAG = re.compile(rf'''<(?:!-?|[a-z]*|[a-z]+\s{_ATTRS}(?:"[^"]*|'[^']*)?)\Z''', re.I)
+_CLOSE = {marker: re.compile(re.escape(marker), re.I) for marker in
+          ('-->', '</script', '</style', '</textarea', '</title')}
+_HREF = re.compile(r'''\shref\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s"'>]+))''', re.I)
+_REL = re.compile(r'''\srel\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s"'>]+))''', re.I)
+
+# Result offset step of listing sites paginated with a "start" parameter
+START_PARAM_STEPS = {"indeed.": 10, "linkedin.com": 25}
+
+# An unfinished tag longer than this is dropped instead of buffered
+MAX_TAG_LENGTH = 64 * 1024
+
+
+def job_link_rule(site_url):
+    """The test a link of a listing site must pass to count as a job posting"""
+    site = site_url.lower()
+    if 'linkedin.com' in site:
+        return lambda href: '/jobs/view/' in href
+    if 'indeed.com' in site:
+        return lambda href: '/viewjob?' in href or '/company/' in href
+    return lambda href: '/job/' in href or '/career/' in href or '/position/' in href or 'viewjob' in href
+
+
+class JobLinkExtractor:
+    def __init__(self, site_url):
+        """
+        Streaming extractor of job links from a listing page
+
+        Chunks of HTML are scanned for anchors as they arrive, without
+        building a document tree. Comments and the bodies of script, style,
+        textarea and title elements are skipped, and only an unfinished tag
+        at the end of a chunk is buffered, so memory stays flat whatever the
+        page size. Relative links are resolved with urljoin against the page
+        URL or its <base href>. The rel="next" link, if any, is kept in
+        next_url.
+
+        Args:
+            site_url (str): URL of the listing page
+        """
+        self.base_url = site_url
+        self.links = []
+        self.next_url = None
+        self._accept = job_link_rule(site_url)
+        self._buffer = ""
+        # Closing marker of the comment or raw text element being skipped
+        self._skip_until = None
+
+    def feed(self, chunk):
+        """
+        Scan the next chunk of HTML
+
+        Returns:
+            bool: Always False, every chunk is needed
+        """
+        text = self._buffer + chunk
+        pos = 0
+        while True:
+            if self._skip_until:
+                end = _CLOSE[self._skip_until].search(text, pos)
+                if end is None:
+                    # Keep just enough to find a marker split across chunks
+                    pos = max(pos, len(text) - len(self._skip_until) + 1)
+                    break
+                pos = end.end()
+                self._skip_until = None
+
+            match = _TOKEN.search(text, pos)
+            if match is None:
+                break
+            token = match.group(0)
+            if token == '<!--':
+                self._skip_until = '-->'
+            elif match.group(1):
+                self._skip_until = f'</{match.group(1).lower()}'
+            else:
+                self._handle_tag(match.group(2).lower(), token)
+            pos = match.end()
+
+        # Carry an unfinished tag over to the next chunk
+        rest = text[pos:]
+        if not self._skip_until:
+            partial = _PARTIAL_TAG.search(rest)
+            rest = rest[partial.start():] if partial else ""
+        self._buffer = rest if len(rest) <= MAX_TAG_LENGTH else ""
+        return False
+
+    def close(self):
+        """Finish the page"""
+        self._buffer = ""
+
+    def _handle_tag(self, name, tag):
+        href = _HREF.search(tag)
+        if href is None:
+            return
+        href = html.unescape(next(value for value in href.groups() if value is not None)).strip()
+        if name == 'base':
+            self.base_url = urljoin(self.base_url, href)
+            return
+        rel = _REL.search(tag)
+        if rel and 'next' in next(value for value in rel.groups() if value is not None).lower().split():
+            if self.next_url is None and href:
+                self.next_url = urljoin(self.base_url, href)
+        elif name == 'a' and href and self._accept(href):
+            self.links.append(urljoin(self.base_url, href))
+
+
+def next_page_url(page_url, next_url=None):
+    """
+    URL of the listing page after page_url
+
+    Args:
+        page_url (str): Current listing page
+        next_url (str, optional): The page's rel="next" link, preferred when present
+
+    Returns:
+        str: Next page URL, or None if the site's pagination is unknown
+    """
+    if next_url:
+        return next_url
+    parts = urlsplit(page_url)
+    for domain, step in START_PARAM_STEPS.items():
+        if domain in parts.netloc.lower():
+            query = dict(parse_qsl(parts.query, keep_blank_values=True))
+            try:
+                start = int(query.get("start", 0))
+            except ValueError:
+                return None
+            query["start"] = str(start + step)
+            return urlunsplit((parts.scheme, parts.netloc, parts.path, urlencode(query), ""))
+    return None
@@ -0,0 +1,116 @@
+#llm_cache.py
+
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+import metrics
+
+
+def _normalise(value):
+    """Collapse whitespace in strings so cosmetic differences share a cache entry"""
+    if isinstance(value, str):
+        return ' '.join(value.split())
+    if isinstance(value, dict):
+        return {str(k): _normalise(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_normalise(v) for v in value]
+    return value
+
+
+class LLMCache:
+    def __init__(self, path="llm_cache.sqlite3", ttl=30 * 24 * 3600, max_entries=20000):
+        """
+        Persistent cache of LLM responses
+
+        Args:
+            path (str): SQLite file holding the cache
+            ttl (int): Seconds a response stays valid
+            max_entries (int): Size cap, least recently used entries are evicted beyond it
+        """
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL,
+                value TEXT NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed_at ON responses (accessed_at)")
+
+    @staticmethod
+    def make_key(kind, inputs, model, temperature, version):
+        """
+        Hash of everything that determines a response
+
+        Args:
+            kind (str): Which call is cached, e.g. "extract_jobs"
+            inputs (dict): Prompt inputs
+            model (str): Model name
+            temperature (float): Sampling temperature
+            version (int): Prompt template version, bump it when a template changes
+
+        Returns:
+            str: Cache key
+        """
+        payload = json.dumps({
+            "kind": kind,
+            "inputs": _normalise(inputs),
+            "model": model,
+            "temperature": temperature,
+            "version": version,
+        }, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        """Return the cached response for a key, or None"""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM responses WHERE key = ? AND created_at >= ?", (key, now - self.ttl)
+            ).fetchone()
+            if row is not None:
+                self._conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+        metrics.incr("llm_cache_misses" if row is None else "llm_cache_hits")
+        return None if row is None else json.loads(row[0])
+
+    def put(self, key, value):
+        """Store a JSON serialisable response"""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, created_at, accessed_at, value) VALUES (?, ?, ?, ?)",
+                (key, now, now, json.dumps(value))
+            )
+            self._evict(now)
+
+    def clear(self):
+        """Remove every cached response"""
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+
+    def _evict(self, now):
+        self._conn.execute("DELETE FROM responses WHERE created_at < ?", (now - self.ttl,))
+        count = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        if count > self.max_entries:
+            self._conn.execute(
+                "DELETE FROM responses WHERE key IN (SELECT key FROM responses ORDER BY accessed_at LIMIT ?)",
+                (count - self.max_entries,)
+            )
+
+
+def default_llm_cache():
+    """LLM cache configured from the environment"""
+    return LLMCache(
+        path=os.getenv("LLM_CACHE_PATH", "llm_cache.sqlite3"),
+        ttl=int(os.getenv("LLM_CACHE_TTL", 30 * 24 * 3600)),
+        max_entries=int(os.getenv("LLM_CACHE_MAX_ENTRIES", 20000))
+    )
@@ -1,7 +1,6 @@
 #main.py
 
 import streamlit as st
-from langchain_community.document_loaders import WebBaseLoader
 import os
 import webbrowser
 import urllib.parse
@@ -9,10 +8,10 @@ import pandas as pd
 from datetime import datetime
 from dotenv import load_dotenv
 
-from chains import Chain
-from portfolio import Portfolio
-from utils import clean_text
+from fetcher import get_fetcher
+from registry import get_chain, get_portfolio
 from job_automation import JobAutomation
+from sources import job_postings_from_html
 
 # Load environment variables
 load_dotenv()
@@ -104,6 +103,15 @@ def init_session_state():
 def set_step(step):
     st.session_state.step = step
 
+def ingest_portfolio(file_path):
+    """Stream a saved portfolio CSV into the vector database with a progress bar"""
+    progress_bar = st.progress(0.0, text="Embedding portfolio...")
+    
+    def report(done, total):
+        progress_bar.progress(done / total if total else 1.0, text=f"Embedded {done} of {total} portfolio rows")
+    
+    return get_portfolio(file_path, progress=report)
+
 def open_email_client(subject, body, recipient="", email_service="default"):
     """Open email client with the generated email
     
@@ -189,10 +197,7 @@ def main():
                 try:
                     st.session_state.portfolio_df.to_csv("my_portfolio.csv", index=False)
                     # Initialize portfolio for next step
-                    portfolio = Portfolio()
-                    portfolio.data = st.session_state.portfolio_df
-                    portfolio.reset_collection()
-                    portfolio.load_portfolio()
+                    ingest_portfolio("my_portfolio.csv")
                     
                     st.success("Portfolio saved successfully!")
                     set_step(3)
@@ -215,10 +220,7 @@ def main():
                         df.to_csv("my_portfolio.csv", index=False)
                         
                         # Initialize portfolio for next step
-                        portfolio = Portfolio()
-                        portfolio.data = df
-                        portfolio.reset_collection()
-                        portfolio.load_portfolio()
+                        ingest_portfolio("my_portfolio.csv")
                         
                         st.success("Portfolio updated successfully!")
                         set_step(3)
@@ -243,10 +245,7 @@ def main():
                     st.session_state.portfolio_df.to_csv("my_portfolio.csv", index=False)
                     
                     # Initialize portfolio for next step
-                    portfolio = Portfolio()
-                    portfolio.data = st.session_state.portfolio_df
-                    portfolio.reset_collection()
-                    portfolio.load_portfolio()
+                    get_portfolio("my_portfolio.csv")
         
         # Navigation buttons            
         col1, col2 = st.columns(2)
@@ -281,16 +280,14 @@ def main():
                     with st.spinner("Processing job URL..."):
                         try:
                             # Initialize components
-                            chain = Chain(api_key=st.session_state.api_key)
-                            portfolio = Portfolio()
-                            portfolio.load_portfolio()
+                            chain = get_chain(st.session_state.api_key)
                             
                             # Fetch and process job data
-                            loader = WebBaseLoader([job_url])
-                            data = clean_text(loader.load().pop().page_content)
+                            page = get_fetcher().fetch(job_url)
+                            data = page.cleaned
                             
-                            # Extract job details
-                            jobs = chain.extract_jobs(data)
+                            # Extract job details, from the page's JobPosting JSON-LD if it has one
+                            jobs = job_postings_from_html(page.html, job_url) or chain.extract_jobs(data)
                             
                             if jobs:
                                 st.session_state.job_details = jobs[0]  # Use the first job
@@ -334,17 +331,16 @@ def main():
                         job_auto = JobAutomation(
                             target_sites=sites_list,
                             job_keywords=keywords_list,
-                            max_jobs_per_day=max_results
+                            max_jobs_per_day=max_results,
+                            chain=get_chain(st.session_state.api_key),
+                            portfolio=get_portfolio("my_portfolio.csv")
                         )
                         
                         # Get job listings
-                        all_job_urls = []
-                        for site in sites_list:
-                            job_urls = job_auto.scrape_job_listings(site)
-                            all_job_urls.extend(job_urls)
+                        all_job_urls = job_auto.scrape_all_listings(sites_list)
                         
-                        # Filter relevant jobs
-                        relevant_jobs = job_auto.filter_relevant_jobs(all_job_urls)
+                        # Filter relevant jobs, keeping their pages cached for "Select This Job"
+                        relevant_jobs = job_auto.filter_relevant_jobs(all_job_urls, keep_body=True)
                         
                         # Store in session state
                         st.session_state.search_results = relevant_jobs
@@ -365,14 +361,14 @@ def main():
                             with st.spinner("Processing job..."):
                                 try:
                                     # Initialize components
-                                    chain = Chain(api_key=st.session_state.api_key)
+                                    chain = get_chain(st.session_state.api_key)
                                     
                                     # Fetch and process job data
-                                    loader = WebBaseLoader([job_url])
-                                    data = clean_text(loader.load().pop().page_content)
+                                    page = get_fetcher().fetch(job_url)
+                                    data = page.cleaned
                                     
-                                    # Extract job details
-                                    jobs = chain.extract_jobs(data)
+                                    # Extract job details, from the page's JobPosting JSON-LD if it has one
+                                    jobs = job_postings_from_html(page.html, job_url) or chain.extract_jobs(data)
                                     
                                     if jobs:
                                         st.session_state.job_details = jobs[0]  # Use the first job
@@ -421,47 +417,52 @@ def main():
                 value="Medium"
             )
         
-        # Generate button
-        if st.button("Generate Email"):
-            with st.spinner("Generating email..."):
-                try:
-                    # Initialize components
-                    chain = Chain(api_key=st.session_state.api_key)
-                    portfolio = Portfolio()
-                    portfolio.load_portfolio()
-                    
-                    # Get portfolio matches
-                    skills = st.session_state.job_details.get('skills', [])
-                    links = portfolio.query_links(skills)
-                    
-                    # Generate email with improved formatting instruction
-                    email = chain.write_mail(
-                        st.session_state.job_details, 
-                        links, 
-                        email_length, 
-                        company_name, 
-                        sender_name
-                    )
-                    
-                    # Save the generated email
-                    st.session_state.generated_email = email
-                    
-                    # Extract subject from the email (assuming first line is subject)
-                    email_lines = email.strip().split('\n')
-                    subject = ""
-                    body = email
-                    
-                    if email_lines and email_lines[0].startswith("Subject:"):
-                        subject = email_lines[0].replace("Subject:", "").strip()
-                        body = "\n".join(email_lines[1:])
-                    
-                    st.session_state.email_subject = subject
-                    st.session_state.email_body = body
-                    
-                    set_step(5)
-                    st.rerun()
-                except Exception as e:
-                    st.error(f"An error occurred: {str(e)}")
+        # Generate buttons, regenerating skips the response cache
+        col1, col2 = st.columns(2)
+        with col1:
+            generate = st.button("Generate Email")
+        with col2:
+            regenerate = st.button("Regenerate Email", help="Ask the model for a new email instead of reusing a cached one")
+        
+        if generate or regenerate:
+            try:
+                # Initialize components
+                chain = get_chain(st.session_state.api_key)
+                portfolio = get_portfolio("my_portfolio.csv")
+                
+                # Get portfolio matches
+                skills = st.session_state.job_details.get('skills', [])
+                links = portfolio.match_links(skills)
+                
+                # Stream the email into the page as it is generated
+                email = st.write_stream(chain.stream_mail(
+                    st.session_state.job_details, 
+                    links, 
+                    email_length, 
+                    company_name, 
+                    sender_name,
+                    regenerate=regenerate
+                ))
+                
+                # Save the generated email
+                st.session_state.generated_email = email
+                
+                # Extract subject from the email once the stream is complete (assuming first line is subject)
+                email_lines = email.strip().split('\n')
+                subject = ""
+                body = email
+                
+                if email_lines and email_lines[0].startswith("Subject:"):
+                    subject = email_lines[0].replace("Subject:", "").strip()
+                    body = "\n".join(email_lines[1:])
+                
+                st.session_state.email_subject = subject
+                st.session_state.email_body = body
+                
+                set_step(5)
+                st.rerun()
+            except Exception as e:
+                st.error(f"An error occurred: {str(e)}")
         
         # Navigation button
         if st.button("← Back to Job Selection"):
@@ -0,0 +1,38 @@
+#metrics.py
+
+import threading
+from collections import Counter
+
+# Process-wide counters, e.g. tokens saved by content extraction
+_lock = threading.Lock()
+_counters = Counter()
+
+
+def incr(name, value=1):
+    """Add to a counter"""
+    with _lock:
+        _counters[name] += value
+
+
+def get(name):
+    """Current value of a counter"""
+    with _lock:
+        return _counters[name]
+
+
+def snapshot():
+    """Copy of every counter"""
+    with _lock:
+        return dict(_counters)
+
+
+def since(start):
+    """Change of every counter since an earlier snapshot"""
+    with _lock:
+        return {name: value - start.get(name, 0) for name, value in _counters.items()}
+
+
+def reset():
+    """Zero every counter"""
+    with _lock:
+        _counters.clear()
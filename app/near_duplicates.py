@@ -0,0 +1,162 @@
+#near_duplicates.py
+
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+from collections import Counter
+
+# Bit widths of the fingerprint bands; fingerprints within len(BAND_WIDTHS) - 1
+# bits of each other always share a band
+BAND_WIDTHS = [10, 9, 9, 9, 9, 9, 9]
+BANDS = len(BAND_WIDTHS)
+
+
+def simhash(text, shingle_size=2):
+    """
+    64-bit SimHash of the word shingles of a text
+
+    Texts that share most of their shingles get fingerprints that differ
+    in only a few bits.
+
+    Args:
+        text (str): Cleaned text
+        shingle_size (int): Words per shingle
+
+    Returns:
+        int: Unsigned 64-bit fingerprint
+    """
+    words = text.lower().split()
+    shingles = Counter(
+        " ".join(words[i:i + shingle_size]) for i in range(max(len(words) - shingle_size + 1, 1))
+    )
+    weights = [0] * 64
+    for shingle, count in shingles.items():
+        value = int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "little")
+        for bit in range(64):
+            weights[bit] += count if value >> bit & 1 else -count
+    return sum(1 << bit for bit in range(64) if weights[bit] > 0)
+
+
+def _signed(value):
+    """SQLite integers are signed 64-bit"""
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+class NearDuplicateIndex:
+    def __init__(self, path="fingerprints.sqlite3", max_distance=6, min_words=50):
+        """
+        Persistent index of SimHash fingerprints of processed job postings
+
+        Fingerprints are split into seven bands, each indexed. Any two
+        fingerprints within six bits of each other share at least one band
+        exactly, so a lookup only compares the few rows of matching bands.
+
+        Args:
+            path (str): SQLite file holding the fingerprints
+            max_distance (int): Largest Hamming distance counted as a duplicate, at most 6
+            min_words (int): Shorter texts are never treated as duplicates
+        """
+        self.path = path
+        self.max_distance = min(max_distance, BANDS - 1)
+        self.min_words = min_words
+        self._reserved = {}
+        # Fingerprints of released postings, still committed if another of their jobs succeeds
+        self._released = {}
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS fingerprints (
+                job_url TEXT PRIMARY KEY,
+                fingerprint INTEGER NOT NULL,
+                {}
+                created_at REAL NOT NULL
+            )
+        """.format("".join(f"band{band} INTEGER NOT NULL, " for band in range(BANDS))))
+        for band in range(BANDS):
+            self._conn.execute(f"CREATE INDEX IF NOT EXISTS fingerprints_band{band} ON fingerprints (band{band})")
+
+    @staticmethod
+    def _bands(fingerprint):
+        bands = []
+        for width in BAND_WIDTHS:
+            bands.append(fingerprint & (1 << width) - 1)
+            fingerprint >>= width
+        return bands
+
+    def _find(self, fingerprint):
+        for job_url, other in self._reserved.items():
+            if bin(fingerprint ^ other).count("1") <= self.max_distance:
+                return job_url
+        rows = self._conn.execute(
+            "SELECT job_url, fingerprint FROM fingerprints WHERE "
+            + " OR ".join(f"band{band} = ?" for band in range(BANDS)),
+            self._bands(fingerprint)
+        )
+        for job_url, other in rows:
+            if bin(fingerprint ^ (other & (1 << 64) - 1)).count("1") <= self.max_distance:
+                return job_url
+        return None
+
+    def check(self, job_url, text):
+        """
+        Look for an earlier posting with nearly the same text
+
+        A posting that is not a duplicate is reserved, so later copies in the
+        same run are caught before it is committed. A posting that fails or
+        is never emailed must be released.
+
+        Args:
+            job_url (str): URL of the posting
+            text (str): Cleaned text of the posting
+
+        Returns:
+            str: URL of the posting this one duplicates, or None
+        """
+        if len(text.split()) < self.min_words:
+            return None
+        fingerprint = simhash(text)
+        with self._lock:
+            original = self._find(fingerprint)
+            if original is None or original == job_url:
+                self._reserved[job_url] = fingerprint
+                return None
+            return original
+
+    def commit(self, job_url):
+        """Persist the reserved fingerprint of a processed posting"""
+        with self._lock:
+            fingerprint = self._reserved.pop(job_url, None)
+            if fingerprint is None:
+                fingerprint = self._released.pop(job_url, None)
+            if fingerprint is None:
+                return
+            columns = "".join(f"band{band}, " for band in range(BANDS))
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO fingerprints (job_url, fingerprint, {columns}created_at) "
+                f"VALUES (?, ?, {'?, ' * BANDS}?)",
+                (job_url, _signed(fingerprint), *self._bands(fingerprint), time.time())
+            )
+
+    def release(self, job_url):
+        """Stop a posting that failed or fell past the daily limit from hiding its copies"""
+        with self._lock:
+            fingerprint = self._reserved.pop(job_url, None)
+            if fingerprint is not None:
+                self._released[job_url] = fingerprint
+
+    def reset_run(self):
+        """Forget reservations of postings that were never processed"""
+        with self._lock:
+            self._reserved = {}
+            self._released = {}
+
+
+def default_near_duplicate_index():
+    """Near-duplicate index configured from the environment"""
+    return NearDuplicateIndex(
+        path=os.getenv("FINGERPRINT_DB_PATH", "fingerprints.sqlite3"),
+        max_distance=int(os.getenv("NEAR_DUPLICATE_DISTANCE", 6))
+    )
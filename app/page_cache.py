@@ -0,0 +1,124 @@
+#page_cache.py
+
+import os
+import time
+import sqlite3
+import threading
+from content_extractor import EXTRACTOR_VERSION
+
+
+class PageCache:
+    def __init__(self, path="page_cache.sqlite3", ttl=24 * 3600, max_stale=7 * 24 * 3600, max_bytes=256 * 1024 * 1024,
+                 cleaned_version=0):
+        """
+        On-disk cache of fetched pages keyed by URL
+
+        Entries younger than `ttl` are served without touching the network.
+        Older entries are revalidated with their ETag/Last-Modified validators
+        when they have them and dropped otherwise.
+
+        Args:
+            path (str): SQLite file holding the cache
+            ttl (int): Seconds an entry is served without revalidation
+            max_stale (int): Seconds after which an entry is evicted regardless of validators
+            max_bytes (int): Size cap, least recently used entries are evicted beyond it
+            cleaned_version (int): Version of the content extraction, cleaned texts of another version are dropped
+        """
+        self.path = path
+        self.ttl = ttl
+        self.max_stale = max_stale
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS pages (
+                url TEXT PRIMARY KEY,
+                fetched_at REAL NOT NULL,
+                accessed_at REAL NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                html TEXT NOT NULL,
+                cleaned TEXT,
+                size INTEGER NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS pages_accessed_at ON pages (accessed_at)")
+        if self._conn.execute("PRAGMA user_version").fetchone()[0] != cleaned_version:
+            self._conn.execute("UPDATE pages SET cleaned = NULL, size = length(CAST(html AS BLOB))")
+            self._conn.execute(f"PRAGMA user_version = {int(cleaned_version)}")
+
+    def get(self, url):
+        """Return the cached entry for a URL as a dict, or None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT url, fetched_at, etag, last_modified, html, cleaned FROM pages WHERE url = ?",
+                (url,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("UPDATE pages SET accessed_at = ? WHERE url = ?", (time.time(), url))
+        return dict(zip(("url", "fetched_at", "etag", "last_modified", "html", "cleaned"), row))
+
+    def is_fresh(self, entry, max_age=None):
+        """Check whether an entry can be served without revalidation"""
+        max_age = self.ttl if max_age is None else max_age
+        return time.time() - entry["fetched_at"] < max_age
+
+    def put(self, url, html, etag=None, last_modified=None):
+        """Store a freshly downloaded page"""
+        now = time.time()
+        size = len(html.encode("utf-8", errors="replace"))
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO pages (url, fetched_at, accessed_at, etag, last_modified, html, cleaned, size) "
+                "VALUES (?, ?, ?, ?, ?, ?, NULL, ?)",
+                (url, now, now, etag, last_modified, html, size)
+            )
+            self._evict()
+
+    def touch(self, url):
+        """Mark an entry as fresh again after a 304 Not Modified"""
+        with self._lock:
+            self._conn.execute("UPDATE pages SET fetched_at = ? WHERE url = ?", (time.time(), url))
+
+    def set_cleaned(self, url, cleaned):
+        """Store the cleaned text of a cached page"""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE pages SET cleaned = ?, size = size + ? WHERE url = ?",
+                (cleaned, len(cleaned), url)
+            )
+
+    def clear(self):
+        """Remove every cached page"""
+        with self._lock:
+            self._conn.execute("DELETE FROM pages")
+
+    def _evict(self):
+        now = time.time()
+        # Stale entries without validators can never be revalidated
+        self._conn.execute(
+            "DELETE FROM pages WHERE fetched_at < ? AND etag IS NULL AND last_modified IS NULL",
+            (now - self.ttl,)
+        )
+        self._conn.execute("DELETE FROM pages WHERE fetched_at < ?", (now - self.max_stale,))
+
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM pages").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for url, size in self._conn.execute("SELECT url, size FROM pages ORDER BY accessed_at").fetchall():
+            self._conn.execute("DELETE FROM pages WHERE url = ?", (url,))
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+
+def default_page_cache():
+    """Page cache configured from the environment"""
+    return PageCache(
+        path=os.getenv("PAGE_CACHE_PATH", "page_cache.sqlite3"),
+        ttl=int(os.getenv("PAGE_CACHE_TTL", 24 * 3600)),
+        max_bytes=int(os.getenv("PAGE_CACHE_MAX_BYTES", 256 * 1024 * 1024)),
+        cleaned_version=EXTRACTOR_VERSION
+    )
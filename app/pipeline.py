@@ -0,0 +1,108 @@
+#pipeline.py
+
+import queue
+import threading
+
+# Marks the end of a stage's input
+_DONE = object()
+
+
+class Stage:
+    def __init__(self, name, func, workers=1, queue_size=None, drain=False):
+        """
+        One step of a Pipeline
+
+        Args:
+            name (str): Stage name used in error messages
+            func (callable): Takes one item and returns an iterable of items for the next stage
+            workers (int): Number of worker threads
+            queue_size (int, optional): Capacity of the input queue, defaults to twice the workers
+            drain (bool): Keep processing queued items after the pipeline is stopped
+        """
+        self.name = name
+        self.func = func
+        self.workers = max(1, workers)
+        self.queue = queue.Queue(maxsize=queue_size or 2 * self.workers)
+        self.drain = drain
+        self.finished = 0
+        self.lock = threading.Lock()
+
+
+class Pipeline:
+    def __init__(self, stages):
+        """
+        Stages connected by bounded queues, each served by its own worker threads
+
+        A full queue blocks the stage feeding it, so a slow stage throttles
+        the ones before it instead of letting work pile up in memory. Calling
+        stop() makes every stage discard its pending input, except drain
+        stages, which finish what was already handed to them.
+
+        Args:
+            stages (list): Stage instances in processing order
+        """
+        self.stages = stages
+        self.stopped = threading.Event()
+
+    def stop(self):
+        """Stop feeding new work through the pipeline"""
+        self.stopped.set()
+
+    def _put(self, stage, item):
+        """Hand an item to a stage, giving up if the pipeline stops while its queue is full"""
+        while True:
+            if self.stopped.is_set() and not stage.drain:
+                return False
+            try:
+                stage.queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+
+    def _worker(self, index):
+        stage = self.stages[index]
+        downstream = self.stages[index + 1] if index + 1 < len(self.stages) else None
+        while True:
+            item = stage.queue.get()
+            if item is _DONE:
+                break
+            if self.stopped.is_set() and not stage.drain:
+                continue
+            try:
+                for result in stage.func(item) or ():
+                    if downstream is None or not self._put(downstream, result):
+                        break
+            except Exception as e:
+                print(f"Error in {stage.name} stage: {e}")
+
+        # The last worker out tells every worker of the next stage to finish
+        with stage.lock:
+            stage.finished += 1
+            last = stage.finished == stage.workers
+        if last and downstream is not None:
+            for _ in range(downstream.workers):
+                downstream.queue.put(_DONE)
+
+    def run(self, items):
+        """
+        Feed items to the first stage and wait until every stage has finished
+
+        Args:
+            items (iterable): Input of the first stage
+        """
+        threads = []
+        for index, stage in enumerate(self.stages):
+            for n in range(stage.workers):
+                thread = threading.Thread(target=self._worker, args=(index,), name=f"{stage.name}-{n}", daemon=True)
+                thread.start()
+                threads.append(thread)
+
+        first = self.stages[0]
+        for item in items:
+            if not self._put(first, item):
+                break
+        for _ in range(first.workers):
+            first.queue.put(_DONE)
+
+        for thread in threads:
+            thread.join()
@@ -0,0 +1,126 @@
+#politeness.py
+
+import time
+import asyncio
+import contextlib
+from urllib.parse import urlsplit
+from urllib.robotparser import RobotFileParser
+
+# Longest robots.txt crawl-delay honoured, longer ones would stall a run
+MAX_CRAWL_DELAY = 30
+
+
+def parse_host_intervals(value):
+    """
+    Parse per-host intervals such as "linkedin.com=5,indeed.com=3"
+
+    Returns:
+        dict: Seconds between request starts by domain, malformed entries are skipped
+    """
+    intervals = {}
+    for entry in (value or "").split(","):
+        domain, _, seconds = entry.partition("=")
+        try:
+            intervals[domain.strip().lower().lstrip(".")] = float(seconds)
+        except ValueError:
+            continue
+    intervals.pop("", None)
+    return intervals
+
+
+class _Host:
+    def __init__(self, max_concurrency, min_interval):
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.min_interval = min_interval
+        self.next_start = 0.0
+        self.interval = None
+        self.robots_expires = 0.0
+        self.robots_lock = asyncio.Lock()
+
+
+class HostScheduler:
+    def __init__(self, min_interval=1.0, max_per_host=2, user_agent="*", respect_robots=True, robots_ttl=24 * 3600,
+                 host_intervals=None):
+        """
+        Per-host politeness for the fetcher's event loop
+
+        Every host gets its own queue: at most max_per_host requests in flight
+        and request starts spaced by its interval, the larger of its minimum
+        interval and the crawl-delay in its robots.txt. Hosts never wait for
+        each other, so throughput grows with the number of distinct hosts.
+
+        Args:
+            min_interval (float): Minimum seconds between request starts on one host
+            host_intervals (dict, optional): Minimum seconds by domain, used instead of min_interval
+                for the domain and its subdomains, e.g. {"linkedin.com": 5}
+            max_per_host (int): Maximum requests in flight per host
+            user_agent (str): User agent matched against robots.txt
+            respect_robots (bool): Read crawl-delay from robots.txt
+            robots_ttl (int): Seconds a host's robots.txt is cached
+        """
+        self.min_interval = min_interval
+        self.max_per_host = max_per_host
+        self.user_agent = user_agent
+        self.respect_robots = respect_robots
+        self.robots_ttl = robots_ttl
+        self.host_intervals = {domain.lower(): interval for domain, interval in (host_intervals or {}).items()}
+        self._hosts = {}
+
+    def host_interval(self, hostname):
+        """Minimum interval of a host, from its most specific domain override or min_interval"""
+        labels = hostname.split(".")
+        for i in range(len(labels)):
+            interval = self.host_intervals.get(".".join(labels[i:]))
+            if interval is not None:
+                return interval
+        return self.min_interval
+
+    def _host(self, parts):
+        netloc = parts.netloc.lower()
+        if netloc not in self._hosts:
+            self._hosts[netloc] = _Host(self.max_per_host, self.host_interval(parts.hostname or ""))
+        return self._hosts[netloc]
+
+    async def _crawl_delay(self, session, parts, host):
+        """Crawl-delay of a host from its cached robots.txt"""
+        async with host.robots_lock:
+            now = time.monotonic()
+            if host.interval is not None and now < host.robots_expires:
+                return host.interval
+            delay = None
+            try:
+                async with session.get(f"{parts.scheme}://{parts.netloc}/robots.txt") as response:
+                    if response.status == 200:
+                        parser = RobotFileParser()
+                        parser.parse((await response.text(errors="replace")).splitlines())
+                        delay = parser.crawl_delay(self.user_agent)
+            except Exception:
+                pass
+            host.interval = max(host.min_interval, min(float(delay or 0), MAX_CRAWL_DELAY))
+            host.robots_expires = now + self.robots_ttl
+            return host.interval
+
+    @contextlib.asynccontextmanager
+    async def slot(self, url, session=None):
+        """
+        Wait for the host of a URL to accept another request
+
+        Args:
+            url (str): URL about to be requested
+            session (aiohttp.ClientSession, optional): Session used to read robots.txt
+        """
+        parts = urlsplit(url)
+        host = self._host(parts)
+        async with host.semaphore:
+            if self.respect_robots and session is not None:
+                interval = await self._crawl_delay(session, parts, host)
+            else:
+                interval = host.min_interval
+
+            # Reserve the next start time of this host, then wait for it
+            now = time.monotonic()
+            start = max(now, host.next_start)
+            host.next_start = start + interval
+            if start > now:
+                await asyncio.sleep(start - now)
+            yield
@@ -3,28 +3,207 @@
 import os
 import pandas as pd
 import chromadb
-import uuid
+import hashlib
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from chromadb.utils import embedding_functions
+from vector_matcher import InMemoryMatcher
+from embedding_store import EmbeddingStore, embedding_model_id, text_key
+
+PORTFOLIO_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "my_portfolio.csv")
+VECTORSTORE_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "vectorstore")
+
+_worker_embedding_function = None
+
+
+def row_id(techstack, link):
+    """Stable id of a portfolio row, derived from its content"""
+    return hashlib.sha1(f"{techstack}\x1f{link}".encode("utf-8")).hexdigest()
+
+
+def _embed_batch(documents):
+    """Embed a batch of documents inside a worker process"""
+    global _worker_embedding_function
+    if _worker_embedding_function is None:
+        _worker_embedding_function = embedding_functions.DefaultEmbeddingFunction()
+    return _worker_embedding_function(documents)
+
+
+def _count_rows(file_path):
+    """Cheap row count of a CSV file for progress reporting"""
+    with open(file_path, "rb") as f:
+        return max(sum(chunk.count(b"\n") for chunk in iter(lambda: f.read(1 << 20), b"")) - 1, 0)
 
 
 class Portfolio:
-    def __init__(self, file_path=None):
-        self.file_path = file_path or os.path.join(os.path.dirname(os.path.dirname(__file__)), "my_portfolio.csv")
-        try:
-            self.data = pd.read_csv(self.file_path)
-        except:
-            self.data = pd.DataFrame(columns=["Techstack", "Links"])
-            
-        self.chroma_client = chromadb.PersistentClient(os.path.join(os.path.dirname(os.path.dirname(__file__)), 'vectorstore'))
-        self.collection = self.chroma_client.get_or_create_collection(name="portfolio")
+    def __init__(self, file_path=None, vectorstore_path=None, chroma_client=None, embedding_function=None,
+                 in_memory_max_rows=None):
+        """
+        Portfolio rows and their vector store
+
+        Args:
+            file_path (str, optional): Portfolio CSV, defaults to my_portfolio.csv
+            vectorstore_path (str, optional): Chroma directory
+            chroma_client (optional): Shared Chroma client
+            embedding_function (optional): Shared embedding function
+            in_memory_max_rows (int, optional): Largest collection matched in memory instead of
+                through Chroma, defaults to PORTFOLIO_IN_MEMORY_MAX_ROWS or 50000, 0 disables it
+
+        Embeddings are kept in a sidecar next to the CSV (my_portfolio.embeddings.*),
+        so rebuilding the collection only embeds new or edited Techstack text.
+        The CSV itself is only read into data on first use, ingest_csv streams it.
+        """
+        self.file_path = file_path or PORTFOLIO_PATH
+        self._data = None
+        self.chroma_client = chroma_client or chromadb.PersistentClient(vectorstore_path or VECTORSTORE_PATH)
+        self.embedding_function = embedding_function or embedding_functions.DefaultEmbeddingFunction()
+        self.embedding_store = EmbeddingStore(
+            os.path.splitext(self.file_path)[0] + ".embeddings",
+            embedding_model_id(self.embedding_function)
+        )
+        self.collection = self._get_collection()
+        if in_memory_max_rows is None:
+            in_memory_max_rows = int(os.getenv("PORTFOLIO_IN_MEMORY_MAX_ROWS", 50000))
+        self.in_memory_max_rows = in_memory_max_rows
+        self._matcher = None
+        self._matcher_lock = threading.Lock()
+
+    @property
+    def data(self):
+        """Portfolio rows as a DataFrame, read from the CSV on first access"""
+        if self._data is None:
+            try:
+                self._data = pd.read_csv(self.file_path)
+            except:
+                self._data = pd.DataFrame(columns=["Techstack", "Links"])
+        return self._data
+
+    @data.setter
+    def data(self, value):
+        self._data = value
+
+    def _get_collection(self):
+        return self.chroma_client.get_or_create_collection(name="portfolio", embedding_function=self.embedding_function)
 
     def load_portfolio(self):
         """Load portfolio data into vector database"""
-        if not self.collection.count() or self.collection.count() != len(self.data):
-            self.reset_collection()
-            for _, row in self.data.iterrows():
-                self.collection.add(documents=row["Techstack"],
-                                    metadatas={"links": row["Links"]},
-                                    ids=[str(uuid.uuid4())])
+        self.sync()
+
+    def sync(self):
+        """
+        Bring the vector database in line with the portfolio data
+
+        Rows are keyed by a hash of their content, so only new or edited rows
+        are embedded and only removed rows are deleted.
+
+        Returns:
+            tuple: Number of rows added and number of rows deleted
+        """
+        rows = {}
+        for techstack, link in zip(self.data["Techstack"], self.data["Links"]):
+            rows[row_id(techstack, link)] = (techstack, link)
+
+        existing = set(self.collection.get(include=[])["ids"])
+        stale = [id_ for id_ in existing if id_ not in rows]
+        new = [id_ for id_ in rows if id_ not in existing]
+
+        if stale:
+            self.collection.delete(ids=stale)
+        if new:
+            self._upsert([rows[id_][0] for id_ in new],
+                         [{"links": rows[id_][1]} for id_ in new],
+                         new)
+        if stale or new:
+            self._matcher = None
+        self.embedding_store.save(keep_keys={text_key(techstack) for techstack, _ in rows.values()})
+        return len(new), len(stale)
+
+    def ingest_csv(self, file_path=None, chunk_size=1000, batch_size=256, processes=None, progress=None):
+        """
+        Stream a portfolio CSV into the vector database in bounded chunks
+
+        Memory stays bounded by the chunk size whatever the CSV size. Rows
+        already in the collection are skipped and rows missing from the CSV
+        are deleted, like sync().
+
+        Args:
+            file_path (str, optional): CSV to ingest, defaults to the portfolio file
+            chunk_size (int): Rows read, embedded and written per Chroma call
+            batch_size (int): Documents per embedding call
+            processes (int, optional): Embed batches across a process pool of this size
+            progress (callable, optional): Called with (rows_done, rows_total) after each chunk
+
+        Returns:
+            tuple: Number of rows added and number of rows deleted
+        """
+        file_path = file_path or self.file_path
+        chunk_size = min(chunk_size, self.chroma_client.get_max_batch_size())
+        total = _count_rows(file_path)
+        existing = set(self.collection.get(include=[])["ids"])
+        seen = set()
+        live_texts = set()
+        done = added = 0
+
+        pool = ProcessPoolExecutor(processes) if processes else None
+        try:
+            for chunk in pd.read_csv(file_path, chunksize=chunk_size, usecols=["Techstack", "Links"]):
+                documents, metadatas, ids = [], [], []
+                for techstack, link in zip(chunk["Techstack"], chunk["Links"]):
+                    id_ = row_id(techstack, link)
+                    if id_ in seen:
+                        continue
+                    seen.add(id_)
+                    live_texts.add(text_key(techstack))
+                    if id_ not in existing:
+                        documents.append(techstack)
+                        metadatas.append({"links": link})
+                        ids.append(id_)
+
+                if ids:
+                    self._upsert(documents, metadatas, ids, batch_size, pool)
+                    added += len(ids)
+                done += len(chunk)
+                if progress:
+                    progress(min(done, total), total)
+        finally:
+            if pool:
+                pool.shutdown()
+
+        stale = [id_ for id_ in existing if id_ not in seen]
+        for start in range(0, len(stale), chunk_size):
+            self.collection.delete(ids=stale[start:start + chunk_size])
+        self._matcher = None
+        self.embedding_store.save(keep_keys=live_texts)
+        return added, len(stale)
+
+    def _embed(self, documents, batch_size=256, pool=None):
+        """
+        Embed documents in batches, optionally across a process pool
+
+        Text already in the embedding store is not embedded again. New
+        embeddings are added to the store, call embedding_store.save() to
+        persist them.
+        """
+        embeddings = self.embedding_store.lookup(documents)
+        missing = list(dict.fromkeys(doc for doc, embedding in zip(documents, embeddings) if embedding is None))
+        if not missing:
+            return embeddings
+
+        batches = [missing[start:start + batch_size] for start in range(0, len(missing), batch_size)]
+        results = pool.map(_embed_batch, batches) if pool else map(self.embedding_function, batches)
+        computed = dict(zip(missing, (embedding for batch in results for embedding in batch)))
+        self.embedding_store.add(missing, [computed[doc] for doc in missing])
+        return [computed[doc] if embedding is None else embedding for doc, embedding in zip(documents, embeddings)]
+
+    def _upsert(self, documents, metadatas, ids, batch_size=256, pool=None):
+        """Embed and write documents with as few Chroma calls as possible"""
+        max_batch = self.chroma_client.get_max_batch_size()
+        for start in range(0, len(ids), max_batch):
+            end = start + max_batch
+            self.collection.upsert(documents=documents[start:end],
+                                   metadatas=metadatas[start:end],
+                                   embeddings=self._embed(documents[start:end], batch_size, pool),
+                                   ids=ids[start:end])
     
     def reset_collection(self):
         """Reset the collection"""
@@ -32,7 +211,8 @@ class Portfolio:
             self.chroma_client.delete_collection(name="portfolio")
         except:
             pass
-        self.collection = self.chroma_client.get_or_create_collection(name="portfolio")
+        self.collection = self._get_collection()
+        self._matcher = None
 
     def query_links(self, skills, n_results=2):
         """Query for relevant portfolio links based on skills"""
@@ -45,6 +225,78 @@ class Portfolio:
             
         results = self.collection.query(query_texts=skills, n_results=n_results)
         return results.get('metadatas', [])
+
+    def _get_matcher(self):
+        """In-memory matcher over the collection, or None if it is too large"""
+        with self._matcher_lock:
+            if self._matcher is None:
+                self._matcher = False
+                if 0 < self.collection.count() <= self.in_memory_max_rows:
+                    rows = self.collection.get(include=["documents", "metadatas"])
+                    # Prefer the memory-mapped sidecar over reading vectors back from Chroma
+                    embeddings = self.embedding_store.lookup(rows["documents"])
+                    if any(embedding is None for embedding in embeddings):
+                        embeddings = self.collection.get(ids=rows["ids"], include=["embeddings"])["embeddings"]
+                    self._matcher = InMemoryMatcher(
+                        rows["documents"],
+                        [(metadata or {}).get("links") for metadata in rows["metadatas"]],
+                        embeddings
+                    )
+            return self._matcher or None
+
+    def _rank_links(self, skills, per_skill):
+        """Best links for each skill, from memory when the collection is small enough"""
+        embeddings = self.embedding_function(skills)
+        matcher = self._get_matcher()
+        if matcher is not None:
+            return matcher.rank(skills, embeddings, per_skill)
+
+        count = self.collection.count()
+        if not count:
+            return []
+        results = self.collection.query(
+            query_embeddings=embeddings,
+            n_results=min(per_skill, count),
+            include=["metadatas"]
+        )
+        return [
+            [(metadata or {}).get("links") for metadata in metadatas or []]
+            for metadatas in results.get("metadatas") or []
+        ]
+
+    def match_links(self, skills, top_k=3, per_skill=5, rrf_k=60):
+        """
+        Portfolio links that best cover a set of skills
+
+        All skills are embedded in one call and searched in one query, and
+        the per-skill rankings are merged with reciprocal rank fusion, so a
+        link that ranks well for several skills comes first. Collections up to
+        in_memory_max_rows are searched with an in-memory matrix product plus
+        BM25 over Techstack, larger ones through Chroma.
+
+        Args:
+            skills (list): Skills of a job, or a single skill
+            top_k (int): Number of links returned
+            per_skill (int): Candidates retrieved per skill
+            rrf_k (int): Fusion constant, larger values flatten the rank weights
+
+        Returns:
+            list: Up to top_k dicts with "link" and "score", best first
+        """
+        if isinstance(skills, str):
+            skills = [skills]
+        skills = [skill for skill in dict.fromkeys(str(skill).strip() for skill in skills or []) if skill]
+        if not skills:
+            return []
+
+        scores = {}
+        for links in self._rank_links(skills, per_skill):
+            for rank, link in enumerate(links):
+                if link:
+                    scores[link] = scores.get(link, 0.0) + 1.0 / (rrf_k + rank + 1)
+
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:top_k]
+        return [{"link": link, "score": round(score, 4)} for link, score in ranked]
     
     def add_item(self, techstack, link):
         """Add a new item to the portfolio"""
@@ -53,11 +305,14 @@ class Portfolio:
         self.data.to_csv(self.file_path, index=False)
         
         # Update vector database
-        self.collection.add(
+        self.collection.upsert(
             documents=[techstack],
             metadatas=[{"links": link}],
-            ids=[str(uuid.uuid4())]
+            embeddings=self._embed([techstack]),
+            ids=[row_id(techstack, link)]
         )
+        self._matcher = None
+        self.embedding_store.save()
         
         return True
     
@@ -67,9 +322,8 @@ class Portfolio:
             self.data = self.data.drop(index).reset_index(drop=True)
             self.data.to_csv(self.file_path, index=False)
             
-            # Reset and reload vector database
-            self.reset_collection()
-            self.load_portfolio()
+            # Drop the removed row from the vector database
+            self.sync()
             
             return True
         return False
@@ -0,0 +1,169 @@
+#rate_limiter.py
+
+import os
+import re
+import time
+import random
+import threading
+
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+_DURATION_SECONDS = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+
+
+def parse_duration(value):
+    """Parse rate limit reset durations such as "2m59.56s", "7.66s" or "120ms" into seconds"""
+    if value is None:
+        return None
+    value = str(value).strip()
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = _DURATION_PART.findall(value)
+    if not parts:
+        return None
+    return sum(float(amount) * _DURATION_SECONDS[unit] for amount, unit in parts)
+
+
+class TokenBucket:
+    def __init__(self, capacity, per_minute):
+        """
+        Token bucket refilled continuously at per_minute / 60 tokens per second
+
+        Args:
+            capacity (float): Maximum tokens held
+            per_minute (float): Refill rate
+        """
+        self.capacity = capacity
+        self.rate = per_minute / 60.0
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount, now):
+        """Seconds until amount tokens are available"""
+        self._refill(now)
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+    def consume(self, amount, now):
+        self._refill(now)
+        self.tokens -= amount
+
+    def sync(self, remaining, per_minute=None, now=None):
+        """Align the bucket with the server's view of the remaining quota"""
+        now = time.monotonic() if now is None else now
+        self._refill(now)
+        if per_minute:
+            self.capacity = per_minute
+            self.rate = per_minute / 60.0
+        self.tokens = min(self.tokens, remaining)
+
+
+class RateLimiter:
+    def __init__(self, requests_per_minute=30, tokens_per_minute=12000, max_retries=5, base_delay=1.0, max_delay=60.0):
+        """
+        Client-side limiter for requests and tokens per minute
+
+        Callers reserve an estimated token count before each request. The
+        buckets are corrected from the x-ratelimit-* response headers and
+        from the reported usage, and 429 responses pause every caller.
+
+        Args:
+            requests_per_minute (int): Account request quota
+            tokens_per_minute (int): Account token quota
+            max_retries (int): Retries of a rate limited request
+            base_delay (float): First backoff delay in seconds
+            max_delay (float): Backoff delay cap in seconds
+        """
+        self.requests = TokenBucket(requests_per_minute, requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute, tokens_per_minute)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens):
+        """Block until one request and an estimated number of tokens can be spent"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                wait = max(
+                    self.blocked_until - now,
+                    self.requests.wait_time(1, now),
+                    self.tokens.wait_time(tokens, now)
+                )
+                if wait <= 0:
+                    self.requests.consume(1, now)
+                    self.tokens.consume(tokens, now)
+                    return
+            time.sleep(wait)
+
+    def reconcile(self, estimated, actual):
+        """Correct the token bucket once the real usage of a request is known"""
+        if actual is None:
+            return
+        with self._lock:
+            self.tokens.consume(actual - estimated, time.monotonic())
+
+    def update_from_headers(self, headers):
+        """
+        Read the x-ratelimit-* headers of a response
+
+        Groq reports tokens per minute but requests per day, so only the token
+        bucket is resized; an exhausted quota of either kind pauses callers
+        until it resets.
+        """
+        with self._lock:
+            now = time.monotonic()
+            for kind in ("requests", "tokens"):
+                try:
+                    remaining = float(headers.get(f"x-ratelimit-remaining-{kind}"))
+                except (TypeError, ValueError):
+                    continue
+                if kind == "tokens":
+                    try:
+                        limit = float(headers.get("x-ratelimit-limit-tokens"))
+                    except (TypeError, ValueError):
+                        limit = None
+                    self.tokens.sync(remaining, limit, now)
+                # Quota exhausted: nobody sends until the server's window resets
+                reset = parse_duration(headers.get(f"x-ratelimit-reset-{kind}"))
+                if remaining < 1 and reset:
+                    self.blocked_until = max(self.blocked_until, now + reset)
+
+    def backoff(self, attempt, retry_after=None):
+        """
+        Pause every caller after a 429 and return how long this one should sleep
+
+        Uses exponential backoff with full jitter, never shorter than the
+        server's retry-after.
+        """
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        if retry_after:
+            delay = max(delay, retry_after)
+        with self._lock:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + delay)
+        return delay
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(model_name):
+    """Return the process-wide limiter of a model, shared by every Chain"""
+    with _limiters_lock:
+        if model_name not in _limiters:
+            _limiters[model_name] = RateLimiter(
+                requests_per_minute=int(os.getenv("GROQ_REQUESTS_PER_MINUTE", 30)),
+                tokens_per_minute=int(os.getenv("GROQ_TOKENS_PER_MINUTE", 12000)),
+                max_retries=int(os.getenv("GROQ_MAX_RETRIES", 5))
+            )
+        return _limiters[model_name]
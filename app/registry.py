@@ -0,0 +1,97 @@
+#registry.py
+
+import os
+import threading
+import chromadb
+from chromadb.utils import embedding_functions
+from chains import Chain
+from portfolio import Portfolio, PORTFOLIO_PATH, VECTORSTORE_PATH
+
+# Heavyweight objects shared by every Streamlit session and scheduler tick.
+# Each is created lazily on first use and kept warm until its inputs change.
+_chain_lock = threading.Lock()
+_portfolio_lock = threading.Lock()
+_embedding_lock = threading.Lock()
+_client_lock = threading.Lock()
+
+_chain = None
+_chain_key = None
+_portfolio = None
+_portfolio_stamp = None
+_chroma_client = None
+_embedding_function = None
+
+
+def _file_stamp(file_path):
+    """Modification time and size of a file, None if it does not exist"""
+    try:
+        stat = os.stat(file_path)
+    except OSError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+def get_embedding_function():
+    """Return the shared embedding function, so the model is loaded once"""
+    global _embedding_function
+    with _embedding_lock:
+        if _embedding_function is None:
+            _embedding_function = embedding_functions.DefaultEmbeddingFunction()
+        return _embedding_function
+
+
+def get_chroma_client():
+    """Return the shared persistent Chroma client"""
+    global _chroma_client
+    with _client_lock:
+        if _chroma_client is None:
+            _chroma_client = chromadb.PersistentClient(VECTORSTORE_PATH)
+        return _chroma_client
+
+
+def get_chain(api_key=None):
+    """
+    Return the shared Chain, rebuilt when the API key changes
+
+    Args:
+        api_key (str, optional): GROQ API key, defaults to GROQ_API_KEY
+
+    Returns:
+        Chain: The warm Chain instance
+    """
+    global _chain, _chain_key
+    api_key = api_key or os.getenv("GROQ_API_KEY")
+    with _chain_lock:
+        if _chain is None or _chain_key != api_key:
+            _chain = Chain(api_key=api_key)
+            _chain_key = api_key
+        return _chain
+
+
+def get_portfolio(file_path=None, progress=None):
+    """
+    Return the shared Portfolio, re-synced when the portfolio file changes
+
+    Args:
+        file_path (str, optional): Portfolio CSV, defaults to my_portfolio.csv
+        progress (callable, optional): Ingestion progress callback, see Portfolio.ingest_csv
+
+    Returns:
+        Portfolio: The warm, loaded Portfolio instance
+    """
+    global _portfolio, _portfolio_stamp
+    file_path = os.path.abspath(file_path or PORTFOLIO_PATH)
+    with _portfolio_lock:
+        stamp = _file_stamp(file_path)
+        if _portfolio is None or _portfolio.file_path != file_path or _portfolio_stamp != stamp:
+            portfolio = Portfolio(file_path,
+                                  chroma_client=get_chroma_client(),
+                                  embedding_function=get_embedding_function())
+            if stamp is not None:
+                portfolio.ingest_csv(progress=progress)
+            else:
+                portfolio.load_portfolio()
+            _portfolio = portfolio
+            _portfolio_stamp = stamp
+        return _portfolio
+
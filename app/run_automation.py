@@ -4,9 +4,9 @@ import schedule
 import time
 from datetime import datetime
 import pandas as pd
-from chains import Chain
-from portfolio import Portfolio
+from registry import get_chain, get_portfolio
 from job_automation import JobAutomation
+from fetcher import get_fetcher
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -39,10 +39,9 @@ def run_automation():
     sites_list = [site.strip() for site in settings["sites"].split("\n") if site.strip()]
     emails_per_day = settings["emails_per_day"]
     
-    # Initialize components
-    chain = Chain()
-    portfolio = Portfolio()
-    portfolio.load_portfolio()
+    # Reuse warm components across scheduled runs
+    chain = get_chain()
+    portfolio = get_portfolio()
     
     # Initialize job automation
     job_auto = JobAutomation(
@@ -101,5 +100,6 @@ if __name__ == "__main__":
     # Check if we should run once or schedule
     if len(os.sys.argv) > 1 and os.sys.argv[1] == "--once":
         run_automation()
+        get_fetcher().close()
     else:
         schedule_automation()
\ No newline at end of file
@@ -0,0 +1,361 @@
+#sources.py
+
+import re
+import json
+import html
+from html.parser import HTMLParser
+from urllib.parse import urlsplit, parse_qs
+from xml.etree import ElementTree
+from utils import normalise_job
+from link_extractor import job_link_rule
+
+_BLOCK_END = re.compile(r'<br\s*/?>|</(?:p|div|li|ul|ol|h[1-6]|tr|section)\s*>', re.I)
+_TAG = re.compile(r'<[^>]*>')
+_SPACES = re.compile(r'[^\S\n]+')
+_EXPERIENCE = re.compile(r'\b\d+(?:\s*(?:-|–|to)\s*\d+)?\s*\+?\s*years?\b', re.I)
+# Headings of the list that holds a posting's required skills
+_REQUIREMENTS = re.compile(r"requirement|qualification|skill|experience|must have|about you|you have|you.ll need|"
+                           r"what you.{0,20}(?:bring|need|have)|looking for|tech stack", re.I)
+_LD_JSON = re.compile(r'<script[^>]+type\s*=\s*["\']?application/ld\+json["\']?[^>]*>(.*?)</script\s*>', re.I | re.S)
+_BLOCK_TAGS = {"p", "div", "h1", "h2", "h3", "h4", "h5", "h6", "section"}
+
+# Levels of nested sitemap indexes followed below a target sitemap
+MAX_SITEMAP_DEPTH = 2
+
+
+def html_to_text(fragment):
+    """Plain text of an HTML fragment, one line per block"""
+    text = html.unescape(_TAG.sub(" ", _BLOCK_END.sub("\n", fragment or "")))
+    lines = (_SPACES.sub(" ", line).strip() for line in text.split("\n"))
+    return "\n".join(line for line in lines if line)
+
+
+class _RequirementItems(HTMLParser):
+    def __init__(self):
+        """Collects the list items that follow a requirements heading"""
+        super().__init__(convert_charrefs=True)
+        self.items = []
+        self.heading = ""
+        self._text = []
+        self._item = None
+
+    def _end_block(self):
+        text = " ".join("".join(self._text).split())
+        if text:
+            self.heading = text
+        self._text = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "li":
+            self._item = []
+        elif tag in ("ul", "ol") and self._item is None:
+            self._end_block()
+
+    def handle_endtag(self, tag):
+        if tag == "li" and self._item is not None:
+            item = " ".join("".join(self._item).split())
+            if item and _REQUIREMENTS.search(self.heading):
+                self.items.append(item)
+            self._item = None
+        elif tag in _BLOCK_TAGS and self._item is None:
+            self._end_block()
+
+    def handle_data(self, data):
+        (self._item if self._item is not None else self._text).append(data)
+
+
+def requirement_items(fragment):
+    """
+    Items of the requirement lists of a posting
+
+    Args:
+        fragment (str): HTML of the posting description
+
+    Returns:
+        list: Text of every list item under a heading such as "Requirements"
+    """
+    parser = _RequirementItems()
+    parser.feed(fragment or "")
+    parser.close()
+    return parser.items
+
+
+def _split_skills(value):
+    if isinstance(value, list):
+        return [str(item).strip() for item in value if str(item).strip()]
+    if not value:
+        return []
+    return [item.strip() for item in re.split(r"[,;\n]", html_to_text(str(value))) if item.strip()]
+
+
+class Posting:
+    def __init__(self, url, job=None, text=""):
+        """
+        A job posting found by a source
+
+        Args:
+            url (str): URL of the posting
+            job (dict, optional): The role, experience, skills and description of the job, None if the page must be read
+            text (str): Full plain text of the posting, for keyword filtering
+        """
+        self.url = url
+        self.job = job
+        self.text = text
+
+
+def make_posting(url, role, description_html, experience=None, skills=None, extra_text=""):
+    """
+    Map a structured posting to the dict Chain.extract_jobs returns
+
+    Skills default to the items of the description's requirement lists and
+    experience to the first "N years" phrase of the description.
+
+    Args:
+        url (str): URL of the posting
+        role (str): Job title
+        description_html (str): Description, HTML or plain text
+        experience (str, optional): Required experience
+        skills (list, optional): Required skills
+        extra_text (str): More plain text of the posting, only used for filtering
+
+    Returns:
+        Posting: The posting with its job filled in
+    """
+    text = html_to_text(description_html)
+    if not experience:
+        found = _EXPERIENCE.search(text)
+        experience = found.group(0) if found else ""
+    job = normalise_job({
+        "role": role,
+        "experience": experience,
+        "skills": skills or requirement_items(description_html),
+        "description": text.replace("\n", " "),
+    })
+    return Posting(url, job, "\n".join(part for part in (role, text, extra_text.strip()) if part))
+
+
+class JobSource:
+    """
+    A listing site that publishes its postings in a structured feed
+
+    Subclasses recognise their sites in feed_url and map the feed body to
+    postings in parse.
+    """
+    name = "source"
+
+    def feed_url(self, site_url):
+        """URL of the feed behind a target site, None if the site is not ours"""
+        return None
+
+    def parse(self, body, feed_url):
+        """
+        Postings of a feed
+
+        Args:
+            body (str): The fetched feed
+            feed_url (str): URL it was fetched from
+
+        Returns:
+            tuple: The postings, newest first, and URLs of further feeds to read
+        """
+        raise NotImplementedError
+
+
+def _path_segment(url, index=0):
+    segments = [segment for segment in urlsplit(url).path.split("/") if segment]
+    return segments[index] if len(segments) > index else None
+
+
+class GreenhouseSource(JobSource):
+    """Job boards hosted on boards.greenhouse.io, read through the Job Board API"""
+    name = "greenhouse"
+
+    def feed_url(self, site_url):
+        parts = urlsplit(site_url)
+        host = parts.netloc.lower()
+        if host.startswith("boards-api.greenhouse.io"):
+            return site_url
+        if not host.endswith("greenhouse.io"):
+            return None
+        board = parse_qs(parts.query).get("for", [None])[0] or _path_segment(site_url)
+        if not board or board == "embed":
+            return None
+        return f"https://boards-api.greenhouse.io/v1/boards/{board}/jobs?content=true"
+
+    def parse(self, body, feed_url):
+        jobs = sorted(json.loads(body).get("jobs", []), key=lambda job: job.get("updated_at") or "", reverse=True)
+        return [
+            # Content is HTML escaped once more
+            make_posting(job["absolute_url"], job.get("title", ""), html.unescape(job.get("content") or ""),
+                         extra_text=(job.get("location") or {}).get("name", ""))
+            for job in jobs if job.get("absolute_url")
+        ], []
+
+
+class LeverSource(JobSource):
+    """Job sites hosted on jobs.lever.co, read through the Postings API"""
+    name = "lever"
+
+    def feed_url(self, site_url):
+        host = urlsplit(site_url).netloc.lower()
+        if host.startswith("api.") and host.endswith("lever.co"):
+            return site_url
+        if host not in ("jobs.lever.co", "jobs.eu.lever.co"):
+            return None
+        company = _path_segment(site_url)
+        if not company:
+            return None
+        api = "api.eu.lever.co" if host == "jobs.eu.lever.co" else "api.lever.co"
+        return f"https://{api}/v0/postings/{company}?mode=json"
+
+    def parse(self, body, feed_url):
+        postings = []
+        for job in sorted(json.loads(body), key=lambda job: job.get("createdAt") or 0, reverse=True):
+            if not job.get("hostedUrl"):
+                continue
+            sections = [job.get("description") or job.get("descriptionPlain") or ""]
+            skills = []
+            for section in job.get("lists") or []:
+                heading, content = section.get("text", ""), section.get("content", "")
+                sections.append(f"<h3>{heading}</h3><ul>{content}</ul>")
+                if _REQUIREMENTS.search(heading):
+                    skills.extend(html_to_text(content).split("\n"))
+            sections.append(job.get("additional") or job.get("additionalPlain") or "")
+            categories = job.get("categories") or {}
+            postings.append(make_posting(job["hostedUrl"], job.get("text", ""), "\n".join(sections), skills=skills,
+                                         extra_text=" ".join(str(value) for value in categories.values() if value)))
+        return postings, []
+
+
+class WorkableSource(JobSource):
+    """Careers pages hosted on apply.workable.com, read through the accounts API"""
+    name = "workable"
+
+    def feed_url(self, site_url):
+        host = urlsplit(site_url).netloc.lower()
+        if host == "apply.workable.com":
+            account = _path_segment(site_url)
+        elif host.endswith(".workable.com") and host not in ("www.workable.com", "jobs.workable.com"):
+            account = host.split(".")[0]
+        elif host == "www.workable.com" and _path_segment(site_url) == "api":
+            return site_url
+        else:
+            return None
+        if not account or account in ("api", "j"):
+            return None
+        return f"https://www.workable.com/api/accounts/{account}?details=true"
+
+    def parse(self, body, feed_url):
+        jobs = sorted(json.loads(body).get("jobs", []),
+                      key=lambda job: job.get("published_on") or job.get("created_at") or "", reverse=True)
+        postings = []
+        for job in jobs:
+            url = job.get("url") or job.get("shortlink") or job.get("application_url")
+            if not url:
+                continue
+            requirements = f"<h3>Requirements</h3>{job.get('requirements') or ''}"
+            postings.append(make_posting(
+                url, job.get("title", ""), f"{job.get('description') or ''}{requirements}",
+                experience=job.get("experience"),
+                extra_text=" ".join(str(job.get(field) or "") for field in ("function", "industry", "city", "country")),
+            ))
+        return postings, []
+
+
+class SitemapSource(JobSource):
+    """
+    XML sitemaps, their pages are read and checked for JSON-LD as usual
+
+    Only entries that pass the job link rule of listing pages are kept, so
+    about pages, blog posts and category pages are never fetched.
+    """
+    name = "sitemap"
+
+    def feed_url(self, site_url):
+        path = urlsplit(site_url).path.lower()
+        return site_url if path.endswith(".xml") else None
+
+    def parse(self, body, feed_url):
+        root = ElementTree.fromstring(body.encode("utf-8") if isinstance(body, str) else body)
+        entries = []
+        for element in root:
+            fields = {child.tag.rsplit("}", 1)[-1]: (child.text or "").strip() for child in element}
+            if fields.get("loc"):
+                entries.append((fields.get("lastmod", ""), fields["loc"]))
+        entries.sort(reverse=True)
+        if root.tag.endswith("sitemapindex"):
+            return [], [loc for _, loc in entries]
+        accept = job_link_rule(feed_url)
+        return [Posting(loc) for _, loc in entries if accept(loc)], []
+
+
+SOURCES = [GreenhouseSource(), LeverSource(), WorkableSource(), SitemapSource()]
+
+
+def register_source(source):
+    """Add a source, it is tried before the built-in ones"""
+    SOURCES.insert(0, source)
+
+
+def find_source(site_url):
+    """
+    The source that serves a target site
+
+    Returns:
+        tuple: The source and its feed URL, or (None, None) if the site is plain HTML
+    """
+    for source in SOURCES:
+        feed_url = source.feed_url(site_url)
+        if feed_url:
+            return source, feed_url
+    return None, None
+
+
+def _json_ld_postings(value):
+    if isinstance(value, list):
+        for item in value:
+            yield from _json_ld_postings(item)
+    elif isinstance(value, dict):
+        types = value.get("@type")
+        if "JobPosting" in (types if isinstance(types, list) else [types]):
+            yield value
+        elif "@graph" in value:
+            yield from _json_ld_postings(value["@graph"])
+
+
+def _json_ld_experience(value):
+    if isinstance(value, dict):
+        months = value.get("monthsOfExperience")
+        try:
+            return f"{float(months) / 12:g} years" if months else str(value.get("description") or "")
+        except (TypeError, ValueError):
+            return str(value.get("description") or "")
+    return html_to_text(str(value)) if value else ""
+
+
+def job_postings_from_html(page_html, url=""):
+    """
+    Jobs described by schema.org JobPosting JSON-LD in a page
+
+    Args:
+        page_html (str): HTML of the job page
+        url (str): URL of the page
+
+    Returns:
+        list: One job dict per JobPosting, empty if the page has none
+    """
+    jobs = []
+    for script in _LD_JSON.findall(page_html or ""):
+        try:
+            data = json.loads(script, strict=False)
+        except ValueError:
+            continue
+        for posting in _json_ld_postings(data):
+            description = html.unescape(str(posting.get("description") or ""))
+            skills = _split_skills(posting.get("skills")) or _split_skills(posting.get("qualifications"))
+            jobs.append(make_posting(
+                posting.get("url") or url, str(posting.get("title") or ""), description,
+                experience=_json_ld_experience(posting.get("experienceRequirements")),
+                skills=skills,
+            ).job)
+    return [job for job in jobs if job["role"]]
@@ -1,18 +1,131 @@
 #utils.py
 
+import os
 import re
+from concurrent.futures import ProcessPoolExecutor
+
+# Precompiled cleaning patterns. The URL class is the original
+# "(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))" collapsed
+# into one character class, which matches the same strings without the alternation
+_TAG_PATTERN = re.compile(r'<[^>]*>')
+_URL_PATTERN = re.compile(r'https?://[!$-_a-z]+')
+# Every byte except ASCII letters, digits and the space
+_SPECIAL_BYTES = bytes(b for b in range(256) if not (chr(b).isascii() and (chr(b).isalnum() or b == 32)))
+
+# Batches smaller than this are cleaned in-process even when a pool is requested
+MIN_PARALLEL_CHARS = 4 * 1024 * 1024
+
+# Field caps for structured extraction, long descriptions are paid for again in write_mail
+MAX_DESCRIPTION_CHARS = 400
+MAX_SKILLS = 15
+
 
 def clean_text(text):
-    # Remove HTML tags
-    text = re.sub(r'<[^>]*?>', '', text)
+    """
+    Strip tags, URLs and every character except ASCII letters, digits and
+    single spaces
+
+    Each step is one linear pass in C: tag removal stops at the last ">" so
+    stray "<" characters cannot trigger rescans, non-ASCII characters are
+    dropped by the ASCII encoder and the remaining special characters by
+    bytes.translate.
+    """
+    # Remove HTML tags. A "<" after the last ">" can never start a tag
+    end = text.rfind('>') + 1
+    if end:
+        text = _TAG_PATTERN.sub('', text[:end]) + text[end:]
     # Remove URLs
-    text = re.sub(r'http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+', '', text)
-    # Remove special characters
-    text = re.sub(r'[^a-zA-Z0-9 ]', '', text)
-    # Replace multiple spaces with a single space
-    text = re.sub(r'\s{2,}', ' ', text)
-    # Trim leading and trailing whitespace
-    text = text.strip()
-    # Remove extra whitespace
-    text = ' '.join(text.split())
-    return text
\ No newline at end of file
+    text = _URL_PATTERN.sub('', text)
+    # Remove special characters, then collapse spaces and trim
+    data = text.encode('ascii', 'ignore').translate(None, _SPECIAL_BYTES)
+    return b' '.join(data.split()).decode('ascii')
+
+
+def clean_texts(texts, processes=None, chunksize=8):
+    """
+    Clean a batch of texts, optionally across a process pool
+
+    Args:
+        texts (iterable): Texts to clean
+        processes (int, optional): Pool size, capped at the CPU count and only used when the
+            batch is large enough to pay for it
+        chunksize (int): Texts sent to a worker at a time
+
+    Returns:
+        list: Cleaned texts, in input order
+    """
+    texts = list(texts)
+    processes = min(processes or 1, os.cpu_count() or 1)
+    if processes > 1 and len(texts) > 1 and sum(map(len, texts)) >= MIN_PARALLEL_CHARS:
+        with ProcessPoolExecutor(processes) as pool:
+            return list(pool.map(clean_text, texts, chunksize=chunksize))
+    return [clean_text(text) for text in texts]
+
+def estimate_tokens(text):
+    # Roughly 3 words per 4 tokens for English text
+    return round(len(text.split()) * 4 / 3)
+
+
+def split_into_chunks(text, max_tokens, overlap_tokens=50):
+    """Split whitespace separated text into chunks of at most max_tokens estimated tokens"""
+    words = text.split()
+    chunk_words = max(int(max_tokens * 3 / 4), 1)
+    overlap_words = min(int(overlap_tokens * 3 / 4), chunk_words // 4)
+    step = chunk_words - overlap_words
+    return [' '.join(words[start:start + chunk_words])
+            for start in range(0, max(len(words) - overlap_words, 1), step)]
+
+
+def repair_json(text):
+    """Cheap local fixes for almost-valid JSON from an LLM: code fences, preamble, trailing commas and truncation"""
+    text = re.sub(r'^\s*```(?:json)?|```\s*$', '', text.strip()).strip()
+
+    # Keep only the outermost object or array
+    starts = [i for i in (text.find('{'), text.find('[')) if i >= 0]
+    if starts:
+        text = text[min(starts):]
+
+    # Walk the text outside strings to find unclosed brackets of truncated output
+    stack = []
+    in_string = escaped = False
+    end = len(text)
+    for i, ch in enumerate(text):
+        if in_string:
+            if escaped:
+                escaped = False
+            elif ch == '\\':
+                escaped = True
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = True
+        elif ch in '{[':
+            stack.append('}' if ch == '{' else ']')
+        elif ch in '}]':
+            if stack:
+                stack.pop()
+            if not stack:
+                end = i + 1
+                break
+    text = text[:end]
+    if in_string:
+        text += '"'
+    text = text.rstrip().rstrip(',')
+    text += ''.join(reversed(stack))
+    return re.sub(r',\s*([}\]])', r'\1', text)
+
+
+def normalise_job(job):
+    """Coerce an extracted job to the schema and enforce the field caps"""
+    skills = job.get('skills') or []
+    if isinstance(skills, str):
+        skills = [skill.strip() for skill in skills.split(',') if skill.strip()]
+    description = str(job.get('description') or '')
+    if len(description) > MAX_DESCRIPTION_CHARS:
+        description = description[:MAX_DESCRIPTION_CHARS].rsplit(' ', 1)[0]
+    return {
+        'role': str(job.get('role') or ''),
+        'experience': str(job.get('experience') or ''),
+        'skills': [str(skill) for skill in skills][:MAX_SKILLS],
+        'description': description,
+    }
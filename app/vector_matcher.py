@@ -0,0 +1,101 @@
+#vector_matcher.py
+
+import math
+import numpy as np
+from collections import Counter
+from keyword_matcher import normalise_keyword
+
+
+def tech_tokens(text):
+    """Lowercase technology terms of a text, e.g. "Node.js, C++" -> ["node", "js", "c++"]"""
+    return normalise_keyword(str(text)).split()
+
+
+class InMemoryMatcher:
+    def __init__(self, documents, links, embeddings, lexical_weight=0.3, k1=1.2, b=0.75):
+        """
+        Portfolio search over an in-memory embedding matrix and a BM25 index
+
+        Embeddings are held as one contiguous, L2 normalised float32 matrix so
+        every skill of a query is scored against every row with a single
+        matrix product. A BM25 index over the Techstack terms boosts rows
+        that name the exact technology.
+
+        Args:
+            documents (list): Techstack text of each row
+            links (list): Portfolio link of each row
+            embeddings (list): Embedding of each row
+            lexical_weight (float): Weight of the normalised BM25 score next to cosine similarity
+            k1 (float): BM25 term frequency saturation
+            b (float): BM25 length normalisation
+        """
+        self.documents = list(documents)
+        self.links = list(links)
+        self.lexical_weight = lexical_weight
+
+        matrix = np.ascontiguousarray(np.asarray(embeddings, dtype=np.float32))
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        self.matrix = matrix / np.where(norms == 0, 1, norms)
+
+        # Inverted index: term -> (row numbers, BM25 weights)
+        tokenised = [tech_tokens(document) for document in self.documents]
+        lengths = [len(tokens) for tokens in tokenised]
+        average = sum(lengths) / len(lengths) if lengths else 0
+        postings = {}
+        for row, tokens in enumerate(tokenised):
+            for term, tf in Counter(tokens).items():
+                postings.setdefault(term, []).append((row, tf))
+        self.index = {}
+        for term, entries in postings.items():
+            idf = math.log(1 + (len(tokenised) - len(entries) + 0.5) / (len(entries) + 0.5))
+            rows = np.array([row for row, _ in entries], dtype=np.int64)
+            weights = np.array([
+                idf * tf * (k1 + 1) / (tf + k1 * (1 - b + b * lengths[row] / (average or 1)))
+                for row, tf in entries
+            ], dtype=np.float32)
+            self.index[term] = (rows, weights)
+
+    def __len__(self):
+        return len(self.links)
+
+    def _lexical_scores(self, queries):
+        scores = np.zeros((len(queries), len(self.links)), dtype=np.float32)
+        for i, query in enumerate(queries):
+            for term in set(tech_tokens(query)):
+                if term in self.index:
+                    rows, weights = self.index[term]
+                    scores[i, rows] += weights
+            top = scores[i].max()
+            if top > 0:
+                scores[i] /= top
+        return scores
+
+    def rank(self, queries, query_embeddings, n_results=5):
+        """
+        Best rows for each query
+
+        Args:
+            queries (list): Query texts, used for lexical scoring
+            query_embeddings (list): Embedding of each query
+            n_results (int): Rows returned per query
+
+        Returns:
+            list: For each query, the links of its best rows, best first
+        """
+        if not len(self.links) or not queries:
+            return [[] for _ in queries]
+        n_results = min(n_results, len(self.links))
+
+        query_matrix = np.asarray(query_embeddings, dtype=np.float32)
+        norms = np.linalg.norm(query_matrix, axis=1, keepdims=True)
+        query_matrix = query_matrix / np.where(norms == 0, 1, norms)
+
+        scores = query_matrix @ self.matrix.T
+        if self.lexical_weight:
+            scores += self.lexical_weight * self._lexical_scores(queries)
+
+        # Partial sort for the top rows, then order just those
+        top = np.argpartition(-scores, n_results - 1, axis=1)[:, :n_results]
+        order = np.take_along_axis(scores, top, axis=1).argsort(axis=1)[:, ::-1]
+        top = np.take_along_axis(top, order, axis=1)
+        return [[self.links[row] for row in rows] for rows in top]
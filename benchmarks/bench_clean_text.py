@@ -0,0 +1,127 @@
+#bench_clean_text.py
+"""
+Benchmark utils.clean_text against the original six-pass implementation,
+on real pages saved in the page cache (or a directory of .html files),
+and check that both give identical output.
+
+Usage:
+    python benchmarks/bench_clean_text.py --page-cache page_cache.sqlite3
+    python benchmarks/bench_clean_text.py --pages-dir saved_pages/ --processes 4
+    python benchmarks/bench_clean_text.py --fuzz 20000
+"""
+
+import os
+import re
+import sys
+import glob
+import time
+import random
+import sqlite3
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app"))
+
+from utils import clean_text, clean_texts
+
+
+def legacy_clean_text(text):
+    """clean_text as it was before the single-pass rewrite"""
+    text = re.sub(r'<[^>]*?>', '', text)
+    text = re.sub(r'http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+', '', text)
+    text = re.sub(r'[^a-zA-Z0-9 ]', '', text)
+    text = re.sub(r'\s{2,}', ' ', text)
+    text = text.strip()
+    text = ' '.join(text.split())
+    return text
+
+
+def load_pages(page_cache=None, pages_dir=None):
+    """Raw HTML of saved pages"""
+    pages = []
+    if page_cache and os.path.exists(page_cache):
+        conn = sqlite3.connect(page_cache)
+        pages.extend(row[0] for row in conn.execute("SELECT html FROM pages"))
+        conn.close()
+    if pages_dir:
+        for path in sorted(glob.glob(os.path.join(pages_dir, "*.htm*"))):
+            with open(path, encoding="utf-8", errors="replace") as f:
+                pages.append(f.read())
+    return pages
+
+
+def synthetic_pages(count=20, seed=0):
+    """Job-page-like HTML with links, entities, non-ASCII text and stray "<" characters"""
+    rng = random.Random(seed)
+    words = ["Python", "engineer", "développeur", "5+", "years", "AWS/GCP", "C++", "naïve", "<", "a<b",
+             "https://www.linkedin.com/jobs/view/123?trk=abc&refId=x%20y", "(remote)", "—", "€80k", "&amp;"]
+    pages = []
+    for _ in range(count):
+        parts = []
+        for _ in range(20000):
+            if rng.random() < 0.2:
+                parts.append(f'<div class="c{rng.randint(0, 99)}" data-x="{rng.random()}">')
+            parts.append(rng.choice(words))
+            parts.append(rng.choice([" ", "  ", "\n", "\t", ""]))
+        pages.append("".join(parts))
+    return pages
+
+
+def fuzz(iterations, seed=0):
+    """Compare both implementations on random strings from an adversarial alphabet"""
+    rng = random.Random(seed)
+    alphabet = list("<>ahtps:/!$%_-az AZ09\n\t\r\x0b\x0c  é€\\()*,#{}~\"'`[]^@.&+") + ["http://", "https://", "<a>"]
+    for i in range(iterations):
+        text = "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 60)))
+        if clean_text(text) != legacy_clean_text(text):
+            raise AssertionError(f"Mismatch on {text!r}: {clean_text(text)!r} != {legacy_clean_text(text)!r}")
+    print(f"Fuzz: {iterations} random strings, identical output")
+
+
+def throughput(func, pages, repeat):
+    size = sum(len(page.encode("utf-8")) for page in pages) * repeat
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for page in pages:
+            func(page)
+    elapsed = time.perf_counter() - start
+    return size / elapsed / 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--page-cache", default="page_cache.sqlite3", help="Page cache database to read pages from")
+    parser.add_argument("--pages-dir", help="Directory of saved .html pages")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--processes", type=int, default=0, help="Also time clean_texts with a process pool")
+    parser.add_argument("--fuzz", type=int, default=5000, help="Random strings compared for equivalence")
+    args = parser.parse_args()
+
+    pages = load_pages(args.page_cache, args.pages_dir)
+    source = "saved pages"
+    if not pages:
+        pages = synthetic_pages()
+        source = "synthetic pages (no saved pages found)"
+    megabytes = sum(len(page.encode("utf-8")) for page in pages) / 1e6
+    print(f"{len(pages)} {source}, {megabytes:.1f} MB")
+
+    for page in pages:
+        if clean_text(page) != legacy_clean_text(page):
+            raise AssertionError("clean_text output differs from the legacy implementation")
+    print("Output identical on every page")
+    fuzz(args.fuzz)
+
+    legacy = throughput(legacy_clean_text, pages, args.repeat)
+    current = throughput(clean_text, pages, args.repeat)
+    print(f"legacy clean_text: {legacy:8.1f} MB/s")
+    print(f"clean_text:        {current:8.1f} MB/s ({current / legacy:.1f}x)")
+
+    if args.processes:
+        batch = pages * args.repeat
+        start = time.perf_counter()
+        clean_texts(batch, processes=args.processes)
+        elapsed = time.perf_counter() - start
+        print(f"clean_texts x{args.processes}:    {megabytes * args.repeat / elapsed:8.1f} MB/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+#bench_llm_throughput.py
+"""
+Fire a burst of concurrent write_mail calls through Chain and report
+throughput and how many requests were rate limited.
+
+Point it at benchmarks/fake_groq_server.py to test the rate limiter
+without spending tokens:
+
+    GROQ_API_BASE=http://127.0.0.1:8000 GROQ_API_KEY=fake python benchmarks/bench_llm_throughput.py --emails 40
+"""
+
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app"))
+
+import metrics
+from chains import Chain
+from llm_cache import LLMCache
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--emails", type=int, default=40, help="Emails to generate")
+    parser.add_argument("--concurrency", type=int, default=8, help="Concurrent LLM calls")
+    args = parser.parse_args()
+
+    chain = Chain(max_concurrency=args.concurrency, cache=LLMCache(":memory:"))
+    job = {"role": "Python Developer", "skills": ["Python", "Django"], "description": "Backend services"}
+    requests = [{"job": dict(job, id=i), "links": [], "regenerate": True} for i in range(args.emails)]
+
+    start = time.perf_counter()
+    results = chain.write_mails(requests)
+    seconds = time.perf_counter() - start
+
+    failed = sum(isinstance(result, Exception) for result in results)
+    print(f"{len(results) - failed} emails in {seconds:.1f}s ({(len(results) - failed) / seconds * 60:.1f}/min), "
+          f"{failed} failed, {metrics.get('llm_rate_limited')} rate limited responses")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+#bench_portfolio_ingest.py
+"""
+Benchmark portfolio ingestion: the old row-by-row collection.add loop
+against Portfolio.ingest_csv.
+
+Usage:
+    python benchmarks/bench_portfolio_ingest.py --rows 20000 --legacy-rows 1000 --processes 4
+"""
+
+import os
+import sys
+import csv
+import time
+import random
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app"))
+
+from portfolio import Portfolio
+
+TECHNOLOGIES = [
+    "Python", "Django", "Flask", "FastAPI", "React", "Angular", "Vue.js", "Node.js", "Express",
+    "Java", "Spring Boot", "Kotlin", "Swift", "Flutter", "React Native", ".NET", "C#", "Go",
+    "Rust", "Ruby on Rails", "PHP", "Laravel", "MySQL", "PostgreSQL", "MongoDB", "Redis",
+    "Kafka", "Spark", "TensorFlow", "PyTorch", "scikit-learn", "AWS", "Azure", "GCP",
+    "Docker", "Kubernetes", "Terraform", "GraphQL", "Elasticsearch", "Snowflake",
+]
+
+
+def write_csv(path, rows, seed=0):
+    """Write a synthetic portfolio CSV"""
+    rng = random.Random(seed)
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["Techstack", "Links"])
+        for i in range(rows):
+            techstack = ", ".join(rng.sample(TECHNOLOGIES, rng.randint(2, 5)))
+            writer.writerow([techstack, f"https://example.com/portfolio/{i}"])
+
+
+def bench_legacy(csv_path, workdir, rows):
+    """The pre-ingest_csv loop: one embedding call and one write per row"""
+    portfolio = Portfolio(csv_path, os.path.join(workdir, "legacy"))
+    data = portfolio.data.head(rows)
+    start = time.perf_counter()
+    for i, row in data.iterrows():
+        portfolio.collection.add(documents=row["Techstack"],
+                                 metadatas={"links": row["Links"]},
+                                 ids=[str(i)])
+    return len(data), time.perf_counter() - start
+
+
+def bench_ingest(csv_path, workdir, processes):
+    portfolio = Portfolio(csv_path, os.path.join(workdir, "ingest"))
+    start = time.perf_counter()
+    added, _ = portfolio.ingest_csv(processes=processes)
+    return added, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=20000, help="Rows in the synthetic portfolio")
+    parser.add_argument("--legacy-rows", type=int, default=1000, help="Rows timed with the legacy loop (it is slow)")
+    parser.add_argument("--processes", type=int, default=None, help="Embedding process pool size")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        csv_path = os.path.join(workdir, "portfolio.csv")
+        write_csv(csv_path, args.rows)
+
+        rows, seconds = bench_legacy(csv_path, workdir, args.legacy_rows)
+        print(f"legacy row-by-row: {rows} rows in {seconds:.2f}s ({rows / seconds:.1f} rows/s)")
+
+        rows, seconds = bench_ingest(csv_path, workdir, args.processes)
+        print(f"ingest_csv:        {rows} rows in {seconds:.2f}s ({rows / seconds:.1f} rows/s)")
+
+
+if __name__ == "__main__":
+    main()
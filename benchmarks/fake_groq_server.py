@@ -0,0 +1,166 @@
+#fake_groq_server.py
+"""
+Local stand-in for the Groq chat completions API, for exercising the
+rate limiter, retries and concurrency without spending tokens.
+
+It enforces its own requests/tokens per minute quota, answers over-quota
+requests with 429 and a retry-after header, and sends the same
+x-ratelimit-* headers as Groq. Streaming requests are answered with
+server-sent events. With --invalid-json-rate, that share of JSON mode
+requests fails like Groq does on invalid JSON: a 400 json_validate_failed
+error carrying the truncated output in failed_generation.
+
+Usage:
+    python benchmarks/fake_groq_server.py --port 8000 --rpm 30 --tpm 6000 --latency 0.5
+    GROQ_API_BASE=http://127.0.0.1:8000 GROQ_API_KEY=fake python benchmarks/bench_llm_throughput.py
+"""
+
+import json
+import time
+import random
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+EXTRACT_RESPONSE = json.dumps([{
+    "role": "Python Developer",
+    "experience": "3+ years",
+    "skills": ["Python", "Django", "PostgreSQL"],
+    "description": "Build and maintain backend services.",
+}])
+EMAIL_RESPONSE = "Subject: Python development support\n\nHi,\n\nWe can help.\n\nBest regards,\nOm Thakare"
+
+
+class Quota:
+    def __init__(self, rpm, tpm):
+        self.rpm = rpm
+        self.tpm = tpm
+        self.window = []
+        self.lock = threading.Lock()
+
+    def take(self, tokens):
+        """Record a request in the sliding minute, or return seconds to wait"""
+        with self.lock:
+            now = time.monotonic()
+            self.window = [(t, n) for t, n in self.window if now - t < 60]
+            used_tokens = sum(n for _, n in self.window)
+            if len(self.window) + 1 > self.rpm or used_tokens + tokens > self.tpm:
+                return 60 - (now - self.window[0][0]) if self.window else 1.0
+            self.window.append((now, tokens))
+            return 0
+
+    def headers(self):
+        with self.lock:
+            used_tokens = sum(n for _, n in self.window)
+            reset = 60 - (time.monotonic() - self.window[0][0]) if self.window else 0
+            return {
+                "x-ratelimit-limit-requests": str(self.rpm),
+                "x-ratelimit-limit-tokens": str(self.tpm),
+                "x-ratelimit-remaining-requests": str(max(self.rpm - len(self.window), 0)),
+                "x-ratelimit-remaining-tokens": str(max(self.tpm - used_tokens, 0)),
+                "x-ratelimit-reset-requests": f"{reset:.2f}s",
+                "x-ratelimit-reset-tokens": f"{reset:.2f}s",
+            }
+
+
+def make_handler(quota, latency, invalid_json_rate=0.0):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+        def _send(self, status, body, extra_headers):
+            payload = json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            for name, value in extra_headers.items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def _stream(self, request, content, extra_headers):
+            """Send the completion word by word as server-sent events"""
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            for name, value in extra_headers.items():
+                self.send_header(name, value)
+            self.end_headers()
+            words = content.split(" ")
+            for i, word in enumerate(words):
+                chunk = {
+                    "id": "chatcmpl-fake",
+                    "object": "chat.completion.chunk",
+                    "created": int(time.time()),
+                    "model": request.get("model", "fake"),
+                    "choices": [{"index": 0, "delta": {"content": word if i == 0 else " " + word},
+                                 "finish_reason": "stop" if i == len(words) - 1 else None}],
+                }
+                self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+                self.wfile.flush()
+                time.sleep(0.02)
+            self.wfile.write(b"data: [DONE]\n\n")
+
+        def do_POST(self):
+            request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            prompt = " ".join(str(message.get("content", "")) for message in request.get("messages", []))
+            prompt_tokens = round(len(prompt.split()) * 4 / 3)
+            if request.get("response_format", {}).get("type") == "json_object":
+                content = json.dumps({"jobs": json.loads(EXTRACT_RESPONSE)})
+            else:
+                content = EXTRACT_RESPONSE if "VALID JSON" in prompt else EMAIL_RESPONSE
+            completion_tokens = round(len(content.split()) * 4 / 3)
+
+            wait = quota.take(prompt_tokens + completion_tokens)
+            if wait:
+                headers = quota.headers()
+                headers["retry-after"] = f"{wait:.2f}"
+                self._send(429, {"error": {"message": "Rate limit reached", "type": "tokens", "code": "rate_limit_exceeded"}}, headers)
+                return
+
+            time.sleep(latency)
+            json_mode = request.get("response_format", {}).get("type") == "json_object"
+            if json_mode and random.random() < invalid_json_rate:
+                self._send(400, {"error": {
+                    "message": "Failed to generate JSON. Please adjust your prompt. See 'failed_generation' for more details.",
+                    "type": "invalid_request_error",
+                    "code": "json_validate_failed",
+                    "failed_generation": content[:len(content) // 2],
+                }}, quota.headers())
+                return
+            if request.get("stream"):
+                self._stream(request, content, quota.headers())
+                return
+            self._send(200, {
+                "id": "chatcmpl-fake",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": request.get("model", "fake"),
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+                "usage": {
+                    "prompt_tokens": prompt_tokens,
+                    "completion_tokens": completion_tokens,
+                    "total_tokens": prompt_tokens + completion_tokens,
+                },
+            }, quota.headers())
+
+    return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--rpm", type=int, default=30, help="Requests per minute quota")
+    parser.add_argument("--tpm", type=int, default=6000, help="Tokens per minute quota")
+    parser.add_argument("--latency", type=float, default=0.5, help="Seconds per completion")
+    parser.add_argument("--invalid-json-rate", type=float, default=0.0,
+                        help="Share of JSON mode requests rejected with json_validate_failed")
+    args = parser.parse_args()
+
+    handler = make_handler(Quota(args.rpm, args.tpm), args.latency, args.invalid_json_rate)
+    server = ThreadingHTTPServer(("127.0.0.1", args.port), handler)
+    print(f"Fake Groq API on http://127.0.0.1:{args.port} ({args.rpm} rpm, {args.tpm} tpm)")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()